@@ -15,6 +15,10 @@ class Settings(BaseSettings):
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
 
+    # Profile every job, otherwise only jobs submitted with the secret key
+    # in the X-Profile-Key header are profiled
+    PROFILE_JOBS: bool = os.getenv("PROFILE_JOBS", "False").lower() == "true"
+
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
 
@@ -25,15 +29,51 @@ class Settings(BaseSettings):
     DB_PORT: str = os.getenv("DB_PORT", "5432")
     DB_NAME: str = os.getenv("DB_NAME", "format_ninja")
 
+    # Database connection pool settings
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
     # GCP settings
     GCP_PROJECT_ID: str = os.getenv("GCP_PROJECT_ID", "exo-ninja")
     GCP_LOCATION: str = os.getenv("GCP_LOCATION", "us-central1")
     GCP_STORAGE_BUCKET: str = os.getenv("GCP_STORAGE_BUCKET", "format-ninja-bucket")
     GCP_TASKS_QUEUE: str = os.getenv("GCP_TASKS_QUEUE", "format-ninja-tasks")
 
+    # Cloud Storage transfer settings
+    GCS_MAX_CONNECTIONS: int = int(os.getenv("GCS_MAX_CONNECTIONS", "32"))
+    GCS_DOWNLOAD_CONCURRENCY: int = int(os.getenv("GCS_DOWNLOAD_CONCURRENCY", "8"))
+    GCS_DOWNLOAD_SLICE_MB: int = int(os.getenv("GCS_DOWNLOAD_SLICE_MB", "16"))
+    GCS_UPLOAD_CHUNK_MB: int = int(os.getenv("GCS_UPLOAD_CHUNK_MB", "8"))
+
     # Service account key file path (only used in development)
     GCP_SERVICE_ACCOUNT_KEY: str = os.getenv("GCP_SERVICE_ACCOUNT_KEY", "")
 
+    # Conversion worker pool settings (0 workers converts in the API process)
+    WORKER_POOL_SIZE: int = int(os.getenv("WORKER_POOL_SIZE", "2"))
+    WORKER_MAX_JOBS: int = int(os.getenv("WORKER_MAX_JOBS", "100"))
+    WORKER_MAX_MEMORY_MB: int = int(os.getenv("WORKER_MAX_MEMORY_MB", "1024"))
+
+    # Job status cache settings (TTL applies to jobs that are not done yet,
+    # the terminal TTL to completed and failed jobs)
+    JOB_CACHE_SIZE: int = int(os.getenv("JOB_CACHE_SIZE", "10000"))
+    JOB_CACHE_TTL_SECONDS: float = float(os.getenv("JOB_CACHE_TTL_SECONDS", "2"))
+    JOB_CACHE_TERMINAL_TTL_SECONDS: float = float(
+        os.getenv("JOB_CACHE_TERMINAL_TTL_SECONDS", "21600")
+    )
+
+    # Seconds after which a job left processing may be claimed by a retry,
+    # keep it above the longest job
+    JOB_CLAIM_LEASE_SECONDS: int = int(os.getenv("JOB_CLAIM_LEASE_SECONDS", "1800"))
+
+    # Job retention settings (0 days keeps jobs forever)
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "30"))
+    JOB_SWEEP_INTERVAL_SECONDS: int = int(
+        os.getenv("JOB_SWEEP_INTERVAL_SECONDS", "3600")
+    )
+    JOB_SWEEP_BATCH_SIZE: int = int(os.getenv("JOB_SWEEP_BATCH_SIZE", "500"))
+
     # API Settings
     API_BASE_URL_DEV: str = os.getenv("API_BASE_URL_DEV", "")
     API_BASE_URL_PROD: str = os.getenv("API_BASE_URL_PROD", "")
@@ -9,6 +9,10 @@ engine = create_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,  # Log SQL queries when in debug mode
     pool_pre_ping=True,  # Check connection before using it
+    pool_size=settings.DB_POOL_SIZE,  # Connections kept open
+    max_overflow=settings.DB_MAX_OVERFLOW,  # Extra connections under load
+    pool_timeout=settings.DB_POOL_TIMEOUT,  # Seconds to wait for a connection
+    pool_recycle=settings.DB_POOL_RECYCLE,  # Replace connections older than this
 )
 
 # Create session factory
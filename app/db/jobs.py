@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.db.models import TransformationJob, TransformationStatus
+
+
+def transition_job(
+    db: Session,
+    job_id,
+    condition,
+    to_status,
+    returning=(TransformationJob.job_id,),
+    **values,
+):
+    """
+    Move a job to a new status in a single atomic UPDATE
+
+    The job is only updated if it matches the condition, so concurrent
+    deliveries of the same task cannot both win.
+
+    Args:
+        db: Database session, committed by this function
+        job_id: The job ID
+        condition: SQL expression the job must match, e.g. on its status
+        to_status: The new status
+        returning: Columns returned for the updated job
+        **values: Other columns to set
+
+    Returns:
+        A row with the returned columns, or None if no job matched
+    """
+    if to_status in (TransformationStatus.COMPLETED, TransformationStatus.FAILED):
+        values.setdefault("completed_at", func.now())
+
+    # Return plain columns, an entity would be expired by the commit and
+    # reloaded with another query on first access
+    statement = (
+        update(TransformationJob)
+        .where(TransformationJob.job_id == job_id)
+        .where(condition)
+        .values(status=to_status, **values)
+        .returning(*returning)
+        .execution_options(synchronize_session=False)
+    )
+    job = db.execute(statement).one_or_none()
+    db.commit()
+
+    return job
+
+
+def claim_job(db: Session, job_id, lease_seconds):
+    """
+    Mark a job as processing if no other attempt is working on it
+
+    A pending job is claimed right away, and so is a failed one, since a
+    failed attempt makes Cloud Tasks retry the task. A job already
+    processing is only claimed again once its claim is older than the
+    lease, which is how a job left behind by a crashed attempt gets picked
+    up by a retry.
+
+    Args:
+        db: Database session, committed by this function
+        job_id: The job ID
+        lease_seconds: Time after which a processing job may be reclaimed
+
+    Returns:
+        A row with the job_id, updated_at, job_config and job_metadata of
+        the claimed job, or None if it does not exist, is being processed
+        or is completed. updated_at identifies the claim and is passed to
+        finish_job.
+    """
+    stale = TransformationJob.updated_at < func.now() - timedelta(
+        seconds=lease_seconds
+    )
+    condition = or_(
+        TransformationJob.status.in_(
+            (TransformationStatus.PENDING, TransformationStatus.FAILED)
+        ),
+        and_(TransformationJob.status == TransformationStatus.PROCESSING, stale),
+    )
+
+    return transition_job(
+        db,
+        job_id,
+        condition,
+        TransformationStatus.PROCESSING,
+        returning=(
+            TransformationJob.job_id,
+            TransformationJob.updated_at,
+            TransformationJob.job_config,
+            TransformationJob.job_metadata,
+        ),
+        # Clear the outcome of a failed attempt
+        error_message=None,
+        completed_at=None,
+    )
+
+
+def finish_job(db: Session, job_id, claimed_at, status, **values):
+    """
+    Record the outcome of a job being processed
+
+    Only the latest claim of the job can finish it, an attempt whose lease
+    expired and was taken over by another one is ignored.
+
+    Args:
+        db: Database session, committed by this function
+        job_id: The job ID
+        claimed_at: updated_at of the job as returned by claim_job
+        status: COMPLETED or FAILED
+        **values: Other columns to set (result paths, error, metadata)
+
+    Returns:
+        A row with the job_id, or None if the claim was lost
+    """
+    condition = and_(
+        TransformationJob.status == TransformationStatus.PROCESSING,
+        TransformationJob.updated_at == claimed_at,
+    )
+
+    return transition_job(db, job_id, condition, status, **values)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Enum, Text
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Enum, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -23,12 +23,19 @@ class FileFormat(enum.Enum):
     JSON = "json"
     CSV = "csv"
     EXCEL = "excel"
+    NDJSON = "ndjson"
 
 
 class TransformationJob(Base):
     """Model for tracking transformation jobs."""
 
     __tablename__ = "transformation_jobs"
+    __table_args__ = (
+        # Listing jobs by status, oldest or newest first
+        Index("ix_transformation_jobs_status_created_at", "status", "created_at"),
+        # Retention sweeps over old jobs
+        Index("ix_transformation_jobs_created_at", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
 
@@ -38,6 +45,9 @@ class TransformationJob(Base):
     source_format = Column(Enum(FileFormat), nullable=False)
     target_format = Column(Enum(FileFormat), nullable=False)
 
+    # All requested target formats for multi-target jobs
+    target_formats = Column(JSON, nullable=True)
+
     status = Column(
         Enum(TransformationStatus), default=TransformationStatus.PENDING, nullable=False
     )
@@ -47,6 +57,9 @@ class TransformationJob(Base):
     source_file_path = Column(String, nullable=True)
     result_file_path = Column(String, nullable=True)
 
+    # Result path per target format for multi-target jobs
+    result_file_paths = Column(JSON, nullable=True)
+
     # Configuration for the transformation
     job_config = Column(JSON, nullable=True)
 
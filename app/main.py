@@ -1,11 +1,17 @@
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import inspect, text
 
 # Import database components
 from app.db.database import Base, engine
 
 # Import models
-from app.db.models import TransformationJob
+from app.db.models import TransformationJob, FileFormat
+
+from app.config import settings
+from app.services.retention import run_sweeper
 
 app = FastAPI(
     title="Format Ninja", description="Data Transformation Service API", version="0.1.0"
@@ -24,6 +30,78 @@ app.add_middleware(
 # Create database tables
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_columns()
+    add_enum_values()
+    add_indexes()
+
+
+# Add columns defined after the table was created, since create_all skips
+# tables that exist. Only nullable columns can be added to a table with
+# rows. Existing columns are skipped before ALTER TABLE, which would lock
+# the table even when there is nothing to add.
+def add_columns():
+    if engine.dialect.name != "postgresql":
+        return
+
+    table = TransformationJob.__table__
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(
+                text(
+                    f"ALTER TABLE {table.name} "
+                    f"ADD COLUMN IF NOT EXISTS {column.name} {column_type}"
+                )
+            )
+
+
+# Add indexes defined after the table was created, since create_all skips
+# tables that exist. On PostgreSQL they are built with CREATE INDEX
+# CONCURRENTLY, which does not block writes to the table but makes startup
+# wait for the build. On a large table, run the same statements out of band
+# before deploying instead.
+def add_indexes():
+    table = TransformationJob.__table__
+
+    if engine.dialect.name != "postgresql":
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in table.indexes:
+            columns = ", ".join(column.name for column in index.columns)
+            unique = "UNIQUE " if index.unique else ""
+            try:
+                conn.execute(
+                    text(
+                        f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS "
+                        f"{index.name} ON {table.name} ({columns})"
+                    )
+                )
+            except Exception as e:
+                # Another instance may be building the same index
+                print(f"Error creating index {index.name}: {e}")
+
+
+# Add formats introduced after the enum type was created, since
+# create_all does not alter existing types
+def add_enum_values():
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for file_format in FileFormat:
+            conn.execute(
+                text(
+                    "ALTER TYPE fileformat "
+                    f"ADD VALUE IF NOT EXISTS '{file_format.name}'"
+                )
+            )
 
 
 # Initialize database on startup
@@ -31,6 +109,23 @@ def init_db():
 async def startup_event():
     init_db()
     print("Database tables created successfully")
+    transform.conversion_pool.start()
+
+    # Delete expired jobs in the background
+    if settings.JOB_RETENTION_DAYS > 0:
+        app.state.sweeper = asyncio.create_task(
+            run_sweeper(transform.storage_service, transform.job_status_cache)
+        )
+
+
+# Stop background work on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    transform.conversion_pool.shutdown()
+
+    sweeper = getattr(app.state, "sweeper", None)
+    if sweeper:
+        sweeper.cancel()
 
 
 # Simple root endpoint
@@ -5,20 +5,34 @@ from fastapi import (
     UploadFile,
     File,
     Form,
+    Header,
+    Query,
     BackgroundTasks,
 )
 from fastapi.responses import JSONResponse
+from google.api_core.exceptions import NotFound
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import List, Optional
+import hmac
+import json
 import uuid
 
 from app.db.database import get_db
+from app.db.jobs import claim_job, finish_job
 from app.db.models import TransformationJob, TransformationStatus, FileFormat
 from app.utils.cloud_storage import CloudStorageService
 from app.utils.cloud_tasks import CloudTasksService
+from app.services.preview import PreviewService
+from app.services.worker_pool import ConversionPool, SharedSource, convert
+from app.services.job_cache import JobStatusCache
+from app.utils.filters import compile_predicate
+from app.utils.profiling import JobProfiler
 from app.schemas.transform import (
     TransformationRequest,
     TransformationResponse,
     JobStatusResponse,
+    PreviewResponse,
 )
 from app.config import settings
 
@@ -27,6 +41,17 @@ router = APIRouter(tags=["transformations"])
 # Initialize services
 storage_service = CloudStorageService()
 tasks_service = CloudTasksService()
+preview_service = PreviewService(storage_service)
+conversion_pool = ConversionPool(
+    max_workers=settings.WORKER_POOL_SIZE,
+    max_jobs_per_worker=settings.WORKER_MAX_JOBS,
+    max_memory=settings.WORKER_MAX_MEMORY_MB * 1024 * 1024,
+)
+job_status_cache = JobStatusCache(
+    maxsize=settings.JOB_CACHE_SIZE,
+    ttl=settings.JOB_CACHE_TTL_SECONDS,
+    terminal_ttl=settings.JOB_CACHE_TERMINAL_TTL_SECONDS,
+)
 
 
 @router.post("/transform", response_model=TransformationResponse)
@@ -34,7 +59,9 @@ async def transform_file(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     source_format: FileFormat = Form(...),
-    target_format: FileFormat = Form(...),
+    target_format: List[FileFormat] = Form(...),
+    config: Optional[str] = Form(None),
+    x_profile_key: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ):
     """
@@ -42,13 +69,36 @@ async def transform_file(
     - Uploads file to Cloud Storage
     - Creates a job record
     - Enqueues a task for processing
+
+    target_format may be repeated to produce several outputs from a
+    single read of the source. The optional config is a JSON object with
+    converter options (delimiter, fields, select, where, profile, ...)
+
+    Admins can turn on profiling for the job by sending the secret key in
+    the X-Profile-Key header
     """
+    # Drop duplicate targets, keeping the submitted order
+    target_formats = list(dict.fromkeys(target_format))
+
     # Validate format conversion is supported
-    if not _is_supported_conversion(source_format, target_format):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Conversion from {source_format} to {target_format} is not supported",
-        )
+    for target in target_formats:
+        if not _is_supported_conversion(source_format, target):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Conversion from {source_format} to {target} is not supported",
+            )
+
+    # Parse the transformation config
+    job_config = _parse_config(config)
+
+    # Enable profiling when requested by an admin
+    if x_profile_key is not None:
+        # Compare in constant time so the key cannot be guessed by timing
+        if not settings.SECRET_KEY or not hmac.compare_digest(
+            x_profile_key.encode("utf-8"), settings.SECRET_KEY.encode("utf-8")
+        ):
+            raise HTTPException(status_code=403, detail="Invalid profile key")
+        job_config = {**(job_config or {}), "profile": True}
 
     # Generate unique job ID
     job_id = str(uuid.uuid4())
@@ -68,9 +118,11 @@ async def transform_file(
             id=uuid.UUID(job_id),
             job_id=job_id,
             source_format=source_format,
-            target_format=target_format,
+            target_format=target_formats[0],
+            target_formats=[target.value for target in target_formats],
             source_file_path=file_path,
             status=TransformationStatus.PENDING,
+            job_config=job_config,
         )
         db.add(job)
         db.commit()
@@ -79,8 +131,10 @@ async def transform_file(
         tasks_service.create_transform_task(
             job_id=job_id,
             source_format=source_format.value,
-            target_format=target_format.value,
+            target_format=target_formats[0].value,
             source_path=file_path,
+            config=job_config,
+            target_formats=[target.value for target in target_formats],
         )
 
         return TransformationResponse(
@@ -101,11 +155,30 @@ async def transform_file(
 def get_job_status(job_id: str, db: Session = Depends(get_db)):
     """
     Get the status of a transformation job
+    - Served from the job status cache when possible
     """
-    job = db.query(TransformationJob).filter(TransformationJob.job_id == job_id).first()
+    job = job_status_cache.get(job_id)
 
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+    if job is None:
+        # Only load the columns needed for the response
+        job = (
+            db.query(
+                TransformationJob.job_id,
+                TransformationJob.status,
+                TransformationJob.created_at,
+                TransformationJob.updated_at,
+                TransformationJob.result_file_path,
+                TransformationJob.result_file_paths,
+                TransformationJob.error_message,
+            )
+            .filter(TransformationJob.job_id == job_id)
+            .first()
+        )
+
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        job_status_cache.set(job_id, job)
 
     response = JobStatusResponse(
         job_id=job.job_id,
@@ -121,6 +194,13 @@ def get_job_status(job_id: str, db: Session = Depends(get_db)):
             file_path=job.result_file_path, expiration=3600
         )
 
+    # Include one download URL per target for multi-target jobs
+    if job.status == TransformationStatus.COMPLETED and job.result_file_paths:
+        response.result_urls = {
+            target: storage_service.get_signed_url(file_path=path, expiration=3600)
+            for target, path in job.result_file_paths.items()
+        }
+
     # Include error message if job failed
     if job.status == TransformationStatus.FAILED and job.error_message:
         response.error = job.error_message
@@ -128,6 +208,61 @@ def get_job_status(job_id: str, db: Session = Depends(get_db)):
     return response
 
 
+@router.get("/jobs/{job_id}/preview", response_model=PreviewResponse)
+def get_job_preview(
+    job_id: str,
+    rows: int = Query(10, ge=1, le=1000),
+    source: bool = False,
+    db: Session = Depends(get_db),
+):
+    """
+    Preview the first rows of a job's result, or of its source file
+    - The source is previewed when requested or while the job has no result
+    - Only the beginning of the file is read
+    """
+    job = db.query(TransformationJob).filter(TransformationJob.job_id == job_id).first()
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    config = job.job_config or {}
+
+    if source or not (
+        job.status == TransformationStatus.COMPLETED and job.result_file_path
+    ):
+        file = "source"
+        file_path = job.source_file_path
+        file_format = job.source_format.value
+        # Show the source as submitted, without select/where applied
+        read_config = {
+            key: config[key]
+            for key in ("encoding", "delimiter", "quotechar", "fields")
+            if key in config
+        }
+    else:
+        file = "result"
+        file_path = job.result_file_path
+        file_format = job.target_format.value
+        read_config = {key: config[key] for key in ("delimiter",) if key in config}
+        # Results written without headers use the configured field names
+        fields = config.get("select") or config.get("fields")
+        if not config.get("headers", True) and fields:
+            read_config["fields"] = fields
+
+    try:
+        preview_rows = preview_service.preview(
+            file_path, file_format, rows, read_config
+        )
+    except NotFound:
+        raise HTTPException(status_code=404, detail=f"The {file} file was not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return PreviewResponse(
+        job_id=job.job_id, file=file, format=file_format, rows=preview_rows
+    )
+
+
 @router.post("/process", include_in_schema=False)
 async def process_transformation(request: dict, db: Session = Depends(get_db)):
     """
@@ -139,57 +274,104 @@ async def process_transformation(request: dict, db: Session = Depends(get_db)):
     target_format = request.get("target_format")
     source_path = request.get("source_path")
     config = request.get("config")
+    target_formats = request.get("target_formats") or [target_format]
 
     if not all([job_id, source_format, target_format, source_path]):
         return JSONResponse(
             status_code=400, content={"error": "Missing required fields"}
         )
 
+    job = None
+    metadata = {}
+
     try:
-        # Get job from database
-        job = (
-            db.query(TransformationJob)
-            .filter(TransformationJob.job_id == job_id)
-            .first()
-        )
+        # Mark the job as processing, in one statement
+        job = claim_job(db, job_id, settings.JOB_CLAIM_LEASE_SECONDS)
+        job_status_cache.invalidate(job_id)
 
         if not job:
-            return JSONResponse(status_code=404, content={"error": "Job not found"})
-
-        # Update job status to processing
-        job.status = TransformationStatus.PROCESSING
-        db.commit()
-
-        # Download file from Cloud Storage
-        file_content = storage_service.download_file(source_path)
-
-        # Perform transformation based on formats
-        if source_format == "json" and target_format == "csv":
-            from app.utils.json_converter import to_csv
-
-            result = to_csv(file_content.decode("utf-8"), config)
-            result_extension = "csv"
-        elif source_format == "csv" and target_format == "json":
-            from app.utils.csv_converter import to_json
-
-            result = to_json(file_content.decode("utf-8"), config)
-            result_extension = "json"
-        else:
-            raise ValueError(
-                f"Unsupported transformation: {source_format} to {target_format}"
+            current = (
+                db.query(TransformationJob.status)
+                .filter(TransformationJob.job_id == job_id)
+                .first()
+            )
+            if not current:
+                return JSONResponse(
+                    status_code=404, content={"error": "Job not found"}
+                )
+
+            # Another attempt holds the job, fail so the task is retried
+            # and takes over if that attempt never finishes
+            if current.status == TransformationStatus.PROCESSING:
+                return JSONResponse(
+                    status_code=409,
+                    content={"status": "in_progress", "job_id": job_id},
+                )
+
+            # Already completed, acknowledge so the task is not retried
+            return JSONResponse(
+                status_code=200, content={"status": "skipped", "job_id": job_id}
             )
 
-        # Upload result to Cloud Storage
-        result_path = storage_service.upload_file(
-            file_data=result.encode("utf-8"),
-            file_format=result_extension,
-            prefix="results",
-        )
+        metadata = dict(job.job_metadata or {})
+
+        # Run the transformation, profiled if an admin asked for it when
+        # submitting the job. The flag is read from the stored job rather
+        # than from the task payload.
+        job_config = job.job_config or {}
+        profiled = settings.PROFILE_JOBS or bool(job_config.get("profile"))
+        profiler = JobProfiler(enabled=profiled)
+        try:
+            # Keep the event loop free for health checks
+            if profiled:
+                result_paths, cpu_time = await run_in_threadpool(
+                    _run_profiled_transformation,
+                    profiler,
+                    source_format,
+                    target_formats,
+                    source_path,
+                    config,
+                )
+            else:
+                result_paths, cpu_time = await run_in_threadpool(
+                    _run_transformation,
+                    source_format,
+                    target_formats,
+                    source_path,
+                    config,
+                    False,
+                )
+        finally:
+            # Keep the profile even when the transformation fails
+            if profiler.captured:
+                await run_in_threadpool(_store_profile, job_id, profiler, metadata)
 
         # Update job with success status
-        job.status = TransformationStatus.COMPLETED
-        job.result_file_path = result_path
-        db.commit()
+        metadata["cpu_time"] = cpu_time
+        finished = finish_job(
+            db,
+            job_id,
+            job.updated_at,
+            TransformationStatus.COMPLETED,
+            result_file_path=result_paths[target_formats[0]],
+            result_file_paths=result_paths,
+            job_metadata=metadata,
+        )
+        job_status_cache.invalidate(job_id)
+
+        if not finished:
+            # The lease expired and another attempt took the job over, its
+            # results are the ones recorded so drop ours
+            profile = metadata.get("profile") or {}
+            paths = list(result_paths.values()) + [
+                path
+                for path in (profile.get("profile_path"), profile.get("summary_path"))
+                if path
+            ]
+            await run_in_threadpool(storage_service.delete_files, paths)
+            return JSONResponse(
+                status_code=200, content={"status": "skipped", "job_id": job_id}
+            )
 
         return JSONResponse(
             status_code=200, content={"status": "success", "job_id": job_id}
@@ -198,21 +380,142 @@ async def process_transformation(request: dict, db: Session = Depends(get_db)):
     except Exception as e:
         # Update job with error status
         if job:
-            job.status = TransformationStatus.FAILED
-            job.error_message = str(e)
-            db.commit()
+            db.rollback()
+            finish_job(
+                db,
+                job_id,
+                job.updated_at,
+                TransformationStatus.FAILED,
+                error_message=str(e),
+                job_metadata=metadata,
+            )
+            job_status_cache.invalidate(job_id)
 
+        # Cloud Tasks retries the task, which claims the failed job again
         return JSONResponse(
             status_code=500,
             content={"error": f"Error processing transformation: {str(e)}"},
         )
 
 
+def _run_transformation(
+    source_format, target_formats, source_path, config, inline, profiler=None
+):
+    """
+    Download a source file, convert it and upload the results
+
+    The conversion runs in the worker pool, which reads the source from
+    shared memory, or in the calling thread when inline is set. Each result
+    is uploaded as it is written. A profiler
+    records the allocations once the conversion is done, while the source
+    is still in memory.
+
+    Returns:
+        A tuple of a dictionary mapping each target format to its result
+        path, and the CPU time spent converting in seconds
+    """
+    # Decode the source and write every target format
+    if inline:
+        # Download file from Cloud Storage
+        file_content = storage_service.download_file(source_path)
+        result_paths, cpu_time, _ = convert(
+            source_format, target_formats, file_content, config, storage_service
+        )
+
+        # The peak is tracked separately, the source is the largest
+        # allocation left once the outputs are uploaded
+        if profiler is not None:
+            profiler.capture_allocations()
+
+        return result_paths, cpu_time
+
+    # Download into shared memory, which the workers read without a copy
+    with SharedSource() as source:
+        storage_service.download_file(source_path, allocate=source.allocate)
+        return conversion_pool.convert(source_format, target_formats, source, config)
+
+
+def _run_profiled_transformation(
+    profiler, source_format, target_formats, source_path, config
+):
+    """
+    Run a transformation in the calling thread under a profiler
+
+    cProfile only sees the thread it is enabled in, so the profiler is
+    entered here and the conversion runs inline rather than in the pool.
+    """
+    with profiler:
+        return _run_transformation(
+            source_format, target_formats, source_path, config, True, profiler
+        )
+
+
+def _store_profile(job_id: str, profiler: JobProfiler, metadata: dict):
+    """Upload a job profile next to its results and link it from the metadata"""
+    try:
+        profile_path = storage_service.upload_file(
+            file_data=profiler.profile_data(), file_format="prof", prefix="results"
+        )
+        summary_path = storage_service.upload_file(
+            file_data=profiler.summary().encode("utf-8"),
+            file_format="txt",
+            prefix="results",
+        )
+    except Exception as e:
+        print(f"Error storing profile for job {job_id}: {e}")
+        return
+
+    metadata["profile"] = {
+        "profile_path": profile_path,
+        "summary_path": summary_path,
+        "peak_memory": profiler.peak_memory,
+    }
+
+
 def _is_supported_conversion(source: FileFormat, target: FileFormat) -> bool:
     """Check if the conversion is supported"""
     supported_conversions = [
         (FileFormat.JSON, FileFormat.CSV),
         (FileFormat.CSV, FileFormat.JSON),
+        (FileFormat.JSON, FileFormat.NDJSON),
+        (FileFormat.NDJSON, FileFormat.JSON),
+        (FileFormat.CSV, FileFormat.NDJSON),
+        (FileFormat.NDJSON, FileFormat.CSV),
     ]
 
     return (source, target) in supported_conversions
+
+
+def _parse_config(config: Optional[str]) -> Optional[dict]:
+    """Parse the JSON transformation config submitted with a file"""
+    if not config:
+        return None
+
+    try:
+        parsed = json.loads(config)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid config: {str(e)}")
+
+    if not isinstance(parsed, dict):
+        raise HTTPException(
+            status_code=400, detail="Invalid config: expected an object"
+        )
+
+    # Only admins turn on profiling, through the X-Profile-Key header
+    parsed.pop("profile", None)
+
+    # Reject bad filters now rather than failing the job later
+    select = parsed.get("select")
+    if select is not None and not (
+        isinstance(select, list) and all(isinstance(name, str) for name in select)
+    ):
+        raise HTTPException(
+            status_code=400, detail="Invalid config: select must be a list of names"
+        )
+
+    try:
+        compile_predicate(parsed.get("where"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid config: {str(e)}")
+
+    return parsed
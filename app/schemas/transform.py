@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -8,19 +8,26 @@ class FileFormatEnum(str, Enum):
     JSON = "json"
     CSV = "csv"
     EXCEL = "excel"
+    NDJSON = "ndjson"
 
 
 class TransformationRequest(BaseModel):
     source_format: FileFormatEnum
-    target_format: FileFormatEnum
+    # Repeated form field, one output is produced per target format
+    target_format: List[FileFormatEnum]
     config: Optional[dict] = None
 
     class Config:
         json_schema_extra = {
             "example": {
                 "source_format": "json",
-                "target_format": "csv",
-                "config": {"delimiter": ",", "headers": True},
+                "target_format": ["csv", "ndjson"],
+                "config": {
+                    "delimiter": ",",
+                    "headers": True,
+                    "select": ["id", "name"],
+                    "where": [{"field": "amount", "op": "gt", "value": 100}],
+                },
             }
         }
 
@@ -46,6 +53,7 @@ class JobStatusResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     result_url: Optional[str] = None
+    result_urls: Optional[Dict[str, str]] = None
     error: Optional[str] = None
 
     class Config:
@@ -56,5 +64,27 @@ class JobStatusResponse(BaseModel):
                 "created_at": "2025-03-30T12:00:00Z",
                 "updated_at": "2025-03-30T12:01:05Z",
                 "result_url": "https://storage.googleapis.com/format-ninja-bucket/results/result.csv",
+                "result_urls": {
+                    "csv": "https://storage.googleapis.com/format-ninja-bucket/results/result.csv",
+                    "json": "https://storage.googleapis.com/format-ninja-bucket/results/result.json",
+                },
+            }
+        }
+
+
+class PreviewResponse(BaseModel):
+    job_id: str
+    file: str
+    format: str
+    # Usually objects, JSON arrays may also hold scalars
+    rows: List[Any]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "f47ac10b-58cc-4372-a567-0e02b2c3d479",
+                "file": "result",
+                "format": "json",
+                "rows": [{"id": "1", "name": "Alice"}, {"id": "2", "name": "Bob"}],
             }
         }
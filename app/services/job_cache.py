@@ -0,0 +1,58 @@
+import threading
+import time
+
+from cachetools import TLRUCache
+
+from app.db.models import TransformationStatus
+
+
+# Statuses after which a job never changes, a failed job is retried
+TERMINAL_STATUSES = (TransformationStatus.COMPLETED,)
+
+
+class JobStatusCache:
+    """Bounded in-process cache of job status snapshots."""
+
+    def __init__(self, maxsize, ttl, terminal_ttl, timer=time.monotonic):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of jobs kept, least recently used first out
+            ttl: Seconds a snapshot of a job that is not done yet stays valid
+            terminal_ttl: Seconds a snapshot of a finished job stays valid
+            timer: Clock the TTLs are measured with
+        """
+        self.ttl = ttl
+        self.terminal_ttl = terminal_ttl
+        self._cache = TLRUCache(maxsize=maxsize, ttu=self._time_to_use, timer=timer)
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        """Get the cached snapshot of a job, or None"""
+        with self._lock:
+            return self._cache.get(job_id)
+
+    def set(self, job_id, snapshot):
+        """
+        Cache the snapshot of a job
+
+        Args:
+            job_id: The job ID
+            snapshot: Object with at least a ``status`` attribute
+        """
+        with self._lock:
+            self._cache[job_id] = snapshot
+
+    def invalidate(self, job_id):
+        """Drop the snapshot of a job after it was written to"""
+        with self._lock:
+            self._cache.pop(job_id, None)
+
+    def _time_to_use(self, job_id, snapshot, now):
+        """Get the expiry time of a snapshot, finished jobs are kept longer"""
+        # Finished jobs still expire, so that deletions made by another
+        # instance (e.g. the retention sweep) are eventually seen
+        if snapshot.status in TERMINAL_STATUSES:
+            return now + self.terminal_ttl
+        return now + self.ttl
@@ -0,0 +1,112 @@
+import codecs
+import functools
+import itertools
+import json
+
+from app.utils import json_converter, csv_converter, ndjson_converter
+from app.utils.decoding import detect_encoding, sniff_csv
+
+
+# Size of the first ranged read, doubled until enough rows are found
+PREVIEW_CHUNK_SIZE = 64 * 1024
+
+# Upper bound on the bytes read for a single preview
+PREVIEW_MAX_BYTES = 8 * 1024 * 1024
+
+
+class PreviewService:
+    """Service for previewing the first records of a stored file."""
+
+    def __init__(self, storage_service):
+        """
+        Initialize the preview service
+
+        Args:
+            storage_service: CloudStorageService used for ranged reads
+        """
+        self.storage_service = storage_service
+
+    def preview(self, file_path, file_format, rows, config=None):
+        """
+        Get the first records of a file in Cloud Storage
+
+        Only the beginning of the file is downloaded, so the cost does not
+        depend on the file size. Stored files are never rewritten, so the
+        previews are cached.
+
+        Args:
+            file_path: The path to the file in the bucket
+            file_format: The file format (json, csv, ndjson)
+            rows: Number of records to return
+            config: Optional configuration for reading the file
+
+        Returns:
+            A list of at most ``rows`` dictionaries
+        """
+        if file_format not in ("json", "csv", "ndjson"):
+            raise ValueError(f"Preview is not supported for {file_format} files")
+
+        config_key = json.dumps(config or {}, sort_keys=True)
+        return self._preview(file_path, file_format, rows, config_key)
+
+    @functools.lru_cache(maxsize=256)
+    def _preview(self, file_path, file_format, rows, config_key):
+        """Read a growing prefix of the file until it holds enough records"""
+        config = json.loads(config_key)
+        decoder = None
+        text = ""
+        start = 0
+        size = PREVIEW_CHUNK_SIZE
+
+        while True:
+            chunk = self.storage_service.download_range(
+                file_path, start, start + size - 1
+            )
+            complete = len(chunk) < size
+
+            # Detect the encoding and the CSV dialect from the first chunk
+            if decoder is None:
+                encoding = config.get("encoding") or detect_encoding(chunk)
+                decoder = codecs.getincrementaldecoder(encoding)()
+                text = decoder.decode(chunk, final=complete)
+                if file_format == "csv" and "delimiter" not in config:
+                    for key, value in sniff_csv(text).items():
+                        config.setdefault(key, value)
+            else:
+                text += decoder.decode(chunk, final=complete)
+
+            # Ask for one more record than needed, so that the last one
+            # returned is known not to be cut off
+            records = self._read(text, file_format, config, complete)
+            records = list(itertools.islice(records, rows + 1))
+
+            if len(records) > rows or complete or start + size >= PREVIEW_MAX_BYTES:
+                return records[:rows]
+
+            start += size
+            size *= 2
+
+    def _read(self, text, file_format, config, complete):
+        """
+        Read records from the beginning of a file
+
+        Args:
+            text: Text read so far
+            file_format: The file format (json, csv, ndjson)
+            config: Configuration for reading the file
+            complete: Whether the text holds the whole file
+        """
+        if file_format == "json":
+            if complete:
+                return json_converter.read_records(text, config)
+            return json_converter.read_records(
+                list(json_converter.read_prefix(text)), config
+            )
+
+        # Leave out the last line, which may be cut off
+        if not complete:
+            text = text[: text.rfind("\n") + 1]
+
+        if file_format == "ndjson":
+            return ndjson_converter.read_records(text, config)
+        return csv_converter.read_records(text, config)
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.db.models import TransformationJob
+from app.utils import ndjson_converter
+
+
+def sweep_expired_jobs(
+    db, storage_service, retention_days, batch_size, job_status_cache=None
+):
+    """
+    Delete jobs older than the retention period along with their files
+
+    Jobs are handled in batches. Each batch is archived to Cloud Storage as
+    NDJSON, then its files are deleted, then its rows are deleted. Rows are
+    locked with SKIP LOCKED so several instances can sweep at the same time.
+
+    Args:
+        db: Database session
+        storage_service: CloudStorageService holding the job files
+        retention_days: Age in days after which a job expires
+        batch_size: Number of jobs deleted per batch
+        job_status_cache: Optional JobStatusCache to drop deleted jobs from
+
+    Returns:
+        The number of jobs deleted
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    deleted = 0
+
+    while True:
+        jobs = (
+            db.query(TransformationJob)
+            .filter(TransformationJob.created_at < cutoff)
+            .order_by(TransformationJob.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not jobs:
+            break
+
+        # Keep a record of the deleted jobs
+        archive = ndjson_converter.write_records(_archive_record(job) for job in jobs)
+        storage_service.upload_file(
+            file_data=archive.encode("utf-8"), file_format="ndjson", prefix="archive"
+        )
+
+        storage_service.delete_files(
+            [path for job in jobs for path in _job_file_paths(job)]
+        )
+
+        db.query(TransformationJob).filter(
+            TransformationJob.id.in_([job.id for job in jobs])
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        if job_status_cache is not None:
+            for job in jobs:
+                job_status_cache.invalidate(job.job_id)
+
+        deleted += len(jobs)
+        if len(jobs) < batch_size:
+            break
+
+    return deleted
+
+
+async def run_sweeper(storage_service, job_status_cache=None):
+    """
+    Periodically delete expired jobs, until cancelled
+
+    Args:
+        storage_service: CloudStorageService holding the job files
+        job_status_cache: Optional JobStatusCache to drop deleted jobs from
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            deleted = await run_in_threadpool(
+                sweep_expired_jobs,
+                db,
+                storage_service,
+                settings.JOB_RETENTION_DAYS,
+                settings.JOB_SWEEP_BATCH_SIZE,
+                job_status_cache,
+            )
+            if deleted:
+                print(f"Deleted {deleted} expired jobs")
+        except Exception as e:
+            db.rollback()
+            print(f"Error sweeping expired jobs: {e}")
+        finally:
+            db.close()
+
+        await asyncio.sleep(settings.JOB_SWEEP_INTERVAL_SECONDS)
+
+
+def _job_file_paths(job):
+    """Get the paths of all files stored for a job"""
+    paths = [job.source_file_path, job.result_file_path]
+    paths.extend((job.result_file_paths or {}).values())
+
+    profile = (job.job_metadata or {}).get("profile") or {}
+    paths.extend([profile.get("profile_path"), profile.get("summary_path")])
+
+    # The first result is listed twice for multi-target jobs
+    return list(dict.fromkeys(path for path in paths if path))
+
+
+def _archive_record(job):
+    """Convert a job to a JSON-serializable dictionary"""
+    return {
+        "id": str(job.id),
+        "job_id": job.job_id,
+        "source_format": job.source_format.value,
+        "target_format": job.target_format.value,
+        "target_formats": job.target_formats,
+        "status": job.status.value,
+        "error_message": job.error_message,
+        "source_file_path": job.source_file_path,
+        "result_file_path": job.result_file_path,
+        "result_file_paths": job.result_file_paths,
+        "job_config": job.job_config,
+        "job_metadata": job.job_metadata,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+        "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+    }
@@ -1,4 +1,17 @@
-from app.utils import json_converter, csv_converter, excel_converter
+from app.utils import json_converter, csv_converter, excel_converter, ndjson_converter
+
+
+# Record readers and writers used for multi-target jobs
+READERS = {
+    "json": json_converter.read_records,
+    "csv": csv_converter.read_records,
+    "ndjson": ndjson_converter.read_records,
+}
+WRITERS = {
+    "json": json_converter.write_records,
+    "csv": csv_converter.write_records,
+    "ndjson": ndjson_converter.write_records,
+}
 
 
 class TransformationService:
@@ -7,8 +20,8 @@ class TransformationService:
         Transform data from source format to target format using provided config
 
         Args:
-            source_format: The input format (json, csv, excel)
-            target_format: The output format (json, csv, excel)
+            source_format: The input format (json, csv, excel, ndjson)
+            target_format: The output format (json, csv, excel, ndjson)
             data: The input data to transform
             config: Optional configuration for the transformation
                    (field mappings, options, etc.)
@@ -18,6 +31,14 @@ class TransformationService:
             return json_converter.to_csv(data, config)
         elif source_format == "csv" and target_format == "json":
             return csv_converter.to_json(data, config)
+        elif source_format == "json" and target_format == "ndjson":
+            return ndjson_converter.from_json(data, config)
+        elif source_format == "csv" and target_format == "ndjson":
+            return ndjson_converter.from_csv(data, config)
+        elif source_format == "ndjson" and target_format == "json":
+            return ndjson_converter.to_json(data, config)
+        elif source_format == "ndjson" and target_format == "csv":
+            return ndjson_converter.to_csv(data, config)
         # Pending implementation
         elif source_format == "json" and target_format == "excel":
             return excel_converter.from_json(data, config)
@@ -31,3 +52,55 @@ class TransformationService:
             raise ValueError(
                 f"Unsupported transformation: {source_format} to {target_format}"
             )
+
+    def transform_many(
+        self, source_format, target_formats, data, config=None, outputs=None
+    ):
+        """
+        Transform data from source format to several target formats
+
+        The source is parsed once and the resulting records are handed to
+        one writer per target format. With a single target the records are
+        streamed from the reader to the writer.
+
+        Args:
+            source_format: The input format (json, csv, ndjson)
+            target_formats: List of output formats (json, csv, ndjson)
+            data: The input data to transform
+            config: Optional configuration for the transformation
+            outputs: Optional dictionary of a text stream per target format,
+                     each output is written to its stream as it is produced
+
+        Returns:
+            A dictionary mapping each target format to its output, or to
+            None when written to a stream
+        """
+        outputs = outputs or {}
+
+        for target_format in target_formats:
+            if source_format not in READERS or target_format not in WRITERS:
+                raise ValueError(
+                    f"Unsupported transformation: {source_format} to {target_format}"
+                )
+
+        records = READERS[source_format](data, config)
+
+        # Nothing to share with a single target
+        if len(target_formats) == 1:
+            target_format = target_formats[0]
+            return {
+                target_format: WRITERS[target_format](
+                    records, config, outputs.get(target_format)
+                )
+            }
+
+        # Parse the source a single time for all targets. The writers are
+        # pure Python and hold the GIL, so they run one after the other
+        records = list(records)
+
+        return {
+            target_format: WRITERS[target_format](
+                records, config, outputs.get(target_format)
+            )
+            for target_format in target_formats
+        }
@@ -0,0 +1,312 @@
+import multiprocessing
+import resource
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from app.services.transform import TransformationService
+from app.utils.cloud_storage import CloudStorageService
+from app.utils.decoding import open_source
+
+
+# Modules imported once by the fork server, so workers start warm
+PRELOAD_MODULES = ["app.services.worker_pool"]
+
+# Storage client of a worker process, created on its first job since
+# clients must not be shared across a fork
+_storage_service = None
+
+
+def convert(source_format, target_formats, content, config=None, storage_service=None):
+    """
+    Decode and convert a source file, possibly in a worker process
+
+    Each output is uploaded to Cloud Storage as it is written, so it is
+    never held in memory whole nor sent back from the worker. If the
+    conversion fails, the outputs are discarded.
+
+    Args:
+        source_format: The input format
+        target_formats: List of output formats
+        content: The source file data as bytes
+        config: Optional configuration for the transformation
+        storage_service: CloudStorageService to upload with (default: one
+                         per process)
+
+    Returns:
+        A tuple of the result path by target format, the CPU time spent in
+        seconds and the peak memory of the process in bytes
+    """
+    start = time.process_time()
+    storage_service = storage_service or _get_storage_service()
+
+    source_text, config = open_source(content, source_format, config)
+
+    uploads = {}
+    result_paths = {}
+    try:
+        for target_format in target_formats:
+            uploads[target_format] = storage_service.open_upload(
+                target_format, prefix="results"
+            )
+
+        TransformationService().transform_many(
+            source_format,
+            target_formats,
+            source_text,
+            config,
+            outputs={target: stream for target, (_, stream) in uploads.items()},
+        )
+
+        # Closing the streams sends the last chunks
+        for target_format, (file_path, stream) in uploads.items():
+            stream.close()
+            result_paths[target_format] = file_path
+    except Exception:
+        _discard_uploads(storage_service, uploads, result_paths)
+        raise
+
+    cpu_time = time.process_time() - start
+    # ru_maxrss is reported in KiB on Linux
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    return result_paths, cpu_time, peak_memory
+
+
+def convert_shared(source_format, target_formats, name, size, config=None):
+    """
+    Convert a source file held in shared memory, in a worker process
+
+    Only the name of the shared block is sent to the worker, which reads
+    the file in place instead of receiving a pickled copy.
+
+    Args:
+        source_format: The input format
+        target_formats: List of output formats
+        name: Name of the shared memory block holding the file
+        size: Size of the file in bytes, the block may be larger
+        config: Optional configuration for the transformation
+
+    Returns:
+        The result of convert
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    content = memory.buf[:size]
+    try:
+        return convert(source_format, target_formats, content, config)
+    except BaseException as e:
+        # The frames of the traceback hold views of the block
+        traceback.clear_frames(e.__traceback__)
+        raise
+    finally:
+        content.release()
+        try:
+            memory.close()
+        except BufferError:
+            # Views left in a traceback keep the mapping until collected
+            pass
+
+
+def _get_storage_service():
+    """Get the storage client of this process"""
+    global _storage_service
+    if _storage_service is None:
+        _storage_service = CloudStorageService()
+    return _storage_service
+
+
+def _discard_uploads(storage_service, uploads, result_paths):
+    """Cancel the uploads of a failed conversion and delete finished ones"""
+    try:
+        for _, stream in uploads.values():
+            storage_service.abort_upload(stream)
+        if result_paths:
+            storage_service.delete_files(list(result_paths.values()))
+    except Exception as e:
+        print(f"Error discarding conversion outputs: {e}")
+
+
+def _warm_up():
+    """Task run once per worker to start it ahead of the first job"""
+    return None
+
+
+class SharedSource:
+    """Source file downloaded into shared memory for the worker processes."""
+
+    def __init__(self):
+        """Initialize the source, the block is created by allocate()"""
+        self.buffer = None
+        self._memory = None
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    @property
+    def size(self):
+        return len(self.buffer)
+
+    def allocate(self, size):
+        """
+        Create the shared block for a file
+
+        Args:
+            size: Size of the file in bytes
+
+        Returns:
+            A writable memoryview of the given size
+        """
+        # A shared block cannot be empty
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.buffer = self._memory.buf[:size]
+        return self.buffer
+
+    def close(self):
+        """Free the shared block, once no worker is reading it"""
+        memory, self._memory = self._memory, None
+        if memory is None:
+            return
+
+        self.buffer.release()
+        try:
+            memory.close()
+        except BufferError:
+            # Views left in a traceback keep the mapping until collected
+            pass
+        memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_tb is not None:
+            # The frames of the traceback may hold views of the block
+            traceback.clear_frames(exc_tb)
+        self.close()
+
+
+class ConversionPool:
+    """Pool of warm worker processes running the CPU-bound conversions."""
+
+    def __init__(self, max_workers, max_jobs_per_worker, max_memory):
+        """
+        Initialize the pool, workers are started by start()
+
+        Args:
+            max_workers: Number of worker processes, 0 to convert inline
+            max_jobs_per_worker: Jobs run by a worker before it is replaced
+            max_memory: Peak memory in bytes above which workers are replaced
+        """
+        self.max_workers = max_workers
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_memory = max_memory
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker processes"""
+        if self.max_workers > 0:
+            executor = self._create_executor()
+            self._warm_up(executor)
+            with self._lock:
+                self._executor = executor
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def convert(self, source_format, target_formats, source, config=None):
+        """
+        Convert a source file in a worker process
+
+        The call blocks until the conversion is done, so it should be run
+        outside of the event loop. Without workers the conversion runs in
+        the calling process.
+
+        Args:
+            source_format: The input format
+            target_formats: List of output formats
+            source: SharedSource holding the downloaded file
+            config: Optional configuration for the transformation
+
+        Returns:
+            A tuple of the result path by target format and the CPU time
+            spent in seconds
+        """
+        executor = self._executor
+        if executor is None:
+            result_paths, cpu_time, _ = convert(
+                source_format, target_formats, source.buffer, config
+            )
+            return result_paths, cpu_time
+
+        try:
+            future = executor.submit(
+                convert_shared,
+                source_format,
+                target_formats,
+                source.name,
+                source.size,
+                config,
+            )
+            result_paths, cpu_time, peak_memory = future.result()
+        except BrokenProcessPool:
+            # A worker died, e.g. killed for running out of memory
+            self._recycle(executor)
+            raise
+
+        # ru_maxrss never decreases, so a worker over the limit stays over it
+        if peak_memory > self.max_memory:
+            self._recycle(executor)
+
+        return result_paths, cpu_time
+
+    def _create_executor(self):
+        """Create the executor, its workers are started on demand"""
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD_MODULES)
+
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            max_tasks_per_child=self.max_jobs_per_worker,
+        )
+
+    def _warm_up(self, executor):
+        """Submit a task per worker to have them all running before a job"""
+        for future in [executor.submit(_warm_up) for _ in range(self.max_workers)]:
+            future.result()
+
+    def _recycle(self, executor):
+        """
+        Replace the workers of an executor, unless already replaced
+
+        This runs on the request path, so the new workers are started in
+        the background rather than waited for.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = replacement = self._create_executor()
+
+        threading.Thread(
+            target=self._replace, args=(executor, replacement), daemon=True
+        ).start()
+
+    def _replace(self, executor, replacement):
+        """Start the new workers, then stop the old ones"""
+        try:
+            self._warm_up(replacement)
+        except Exception as e:
+            # Workers are started by the next job anyway
+            print(f"Error starting conversion workers: {e}")
+
+        # Jobs already submitted to the old workers still complete
+        executor.shutdown(wait=False)
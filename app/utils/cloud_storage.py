@@ -1,31 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core.exceptions import NotFound, RequestRangeNotSatisfiable
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import storage
+from requests.adapters import HTTPAdapter
 from app.config import settings
+import base64
+import google.auth
+import google_crc32c
 import os
 import uuid
 
 
+def create_http_session(credentials, max_connections=None):
+    """
+    Create an authorized HTTP session with a sized connection pool.
+
+    The storage client has no public option for its connection pool, the
+    session is passed through the private _http argument. Check it still
+    works when upgrading google-cloud-storage.
+
+    Args:
+        credentials: Credentials used to authorize requests
+        max_connections: Connections kept open per host
+                         (default: settings.GCS_MAX_CONNECTIONS)
+
+    Returns:
+        A session to pass to the storage client
+    """
+    max_connections = max_connections or settings.GCS_MAX_CONNECTIONS
+
+    session = AuthorizedSession(credentials)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
 class CloudStorageService:
     """Service for interacting with Google Cloud Storage."""
 
-    def __init__(self):
-        """Initialize the Cloud Storage client."""
-        if settings.use_gcp_service_account:
+    def __init__(self, client=None):
+        """
+        Initialize the Cloud Storage client.
+
+        Args:
+            client: Optional storage client to use instead of creating one
+        """
+        if client is not None:
+            self.client = client
+        elif settings.use_gcp_service_account:
             # Use service account credentials in development
             from google.oauth2 import service_account
 
             credentials = service_account.Credentials.from_service_account_file(
-                settings.GCP_SERVICE_ACCOUNT_KEY
+                settings.GCP_SERVICE_ACCOUNT_KEY, scopes=storage.Client.SCOPE
             )
+            # _http is private API, see create_http_session
             self.client = storage.Client(
-                credentials=credentials, project=settings.GCP_PROJECT_ID
+                credentials=credentials,
+                project=settings.GCP_PROJECT_ID,
+                _http=create_http_session(credentials),
             )
         else:
             # In production, rely on VM service account
-            self.client = storage.Client()
+            credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
+            # _http is private API, see create_http_session
+            self.client = storage.Client(
+                credentials=credentials, _http=create_http_session(credentials)
+            )
 
         self.bucket_name = settings.GCP_STORAGE_BUCKET
         self.bucket = self.client.bucket(self.bucket_name)
 
+        # Parallel download settings
+        self.download_concurrency = settings.GCS_DOWNLOAD_CONCURRENCY
+        self.download_slice_size = settings.GCS_DOWNLOAD_SLICE_MB * 1024 * 1024
+
+        # Data buffered by streamed uploads before it is sent
+        self.upload_chunk_size = settings.GCS_UPLOAD_CHUNK_MB * 1024 * 1024
+
     def upload_file(self, file_data, file_format, prefix="uploads"):
         """
         Upload a file to Cloud Storage.
@@ -58,18 +112,162 @@ class CloudStorageService:
 
         return file_path
 
-    def download_file(self, file_path):
+    def open_upload(self, file_format, prefix="uploads"):
+        """
+        Open a new file in Cloud Storage for writing text.
+
+        The text is encoded as UTF-8 and sent in chunks as it is written,
+        so the file is never held in memory whole. Closing the stream
+        finishes the upload, abort_upload cancels it.
+
+        Args:
+            file_format: The file format (extension)
+            prefix: Directory prefix for the file (default: 'uploads')
+
+        Returns:
+            A tuple of the path to the file in the bucket and the text
+            stream, which leaves line endings as written
+        """
+        # Generate a unique filename with the correct extension
+        filename = f"{uuid.uuid4()}.{file_format}"
+        file_path = f"{prefix}/{filename}"
+
+        blob = self.bucket.blob(file_path)
+        stream = blob.open(
+            "wt",
+            encoding="utf-8",
+            newline="",
+            chunk_size=self.upload_chunk_size,
+            content_type=self._get_content_type(file_format),
+        )
+
+        return file_path, stream
+
+    def abort_upload(self, stream):
+        """
+        Cancel an upload opened by open_upload, leaving no file behind.
+
+        Args:
+            stream: The text stream returned by open_upload
+        """
+        if stream.closed:
+            return
+
+        # Closing the stream would finish the upload with partial data
+        writer = stream.buffer
+        try:
+            stream.detach()
+        except Exception:
+            # The text still buffered is dropped with the upload anyway
+            pass
+        writer.terminate()
+
+    def download_file(self, file_path, allocate=None):
         """
         Download a file from Cloud Storage.
 
+        The first slice is requested together with the file metadata, so a
+        file smaller than a slice costs a single round trip. The rest of a
+        larger file is downloaded as byte ranges in parallel, written in
+        place into a preallocated buffer.
+
         Args:
             file_path: The path to the file in the bucket
+            allocate: Optional function returning a writable buffer of the
+                      given size to download into, e.g. shared memory
 
         Returns:
-            The file data as bytes
+            The file data as bytes (a bytearray for sliced downloads), or
+            the buffer from allocate
+        """
+        slice_size = self.download_slice_size
+
+        with ThreadPoolExecutor(
+            max_workers=max(self.download_concurrency, 1)
+        ) as executor:
+            # Ranged responses are not checksummed, the file is checked below
+            first_blob = self.bucket.blob(file_path)
+            first_slice = executor.submit(
+                first_blob.download_as_bytes, start=0, end=slice_size - 1, checksum=None
+            )
+
+            # Get the size, generation and checksum meanwhile
+            blob = self.bucket.get_blob(file_path)
+            if blob is None:
+                raise NotFound(f"File not found: {file_path}")
+            if blob.size == 0:
+                return allocate(0) if allocate is not None else b""
+
+            if allocate is not None:
+                buffer = allocate(blob.size)
+            elif blob.size > slice_size:
+                buffer = bytearray(blob.size)
+            else:
+                buffer = None
+            view = memoryview(buffer) if buffer is not None else None
+
+            def download_slice(start):
+                end = min(start + slice_size, blob.size) - 1
+                # Fail rather than mix slices if the file is replaced meanwhile
+                data = blob.download_as_bytes(
+                    start=start,
+                    end=end,
+                    checksum=None,
+                    if_generation_match=blob.generation,
+                )
+                if len(data) != end - start + 1:
+                    raise IOError(f"Incomplete slice downloading {file_path}")
+                view[start : end + 1] = data
+
+            slices = executor.map(
+                download_slice, range(slice_size, blob.size, slice_size)
+            )
+
+            # The first slice is read with the generation of its response
+            data = first_slice.result()
+            if first_blob.generation != blob.generation:
+                raise IOError(f"File replaced while downloading {file_path}")
+            if len(data) != min(slice_size, blob.size):
+                raise IOError(f"Incomplete slice downloading {file_path}")
+
+            if buffer is None:
+                self._check_crc32c(file_path, [data], blob.crc32c)
+                return data
+
+            view[: len(data)] = data
+            # Consume the results to raise any error from the slices
+            list(slices)
+
+        # The checksum only reads bytes objects, feed it slice by slice
+        self._check_crc32c(
+            file_path,
+            (
+                bytes(view[start : start + slice_size])
+                for start in range(0, blob.size, slice_size)
+            ),
+            blob.crc32c,
+        )
+
+        return buffer
+
+    def download_range(self, file_path, start, end):
+        """
+        Download a byte range of a file from Cloud Storage.
+
+        Args:
+            file_path: The path to the file in the bucket
+            start: First byte to download
+            end: Last byte to download (inclusive)
+
+        Returns:
+            The requested bytes, shorter than asked if the file ends first
         """
         blob = self.bucket.blob(file_path)
-        return blob.download_as_bytes()
+        try:
+            return blob.download_as_bytes(start=start, end=end)
+        except RequestRangeNotSatisfiable:
+            # The range starts past the end of the file
+            return b""
 
     def get_public_url(self, file_path):
         """
@@ -107,6 +305,39 @@ class CloudStorageService:
         blob = self.bucket.blob(file_path)
         blob.delete()
 
+    def delete_files(self, file_paths, batch_size=100):
+        """
+        Delete several files from Cloud Storage using batched requests.
+
+        Files that no longer exist are ignored.
+
+        Args:
+            file_paths: The paths to the files in the bucket
+            batch_size: Number of deletions sent per request (at most 100)
+        """
+        for start in range(0, len(file_paths), batch_size):
+            with self.client.batch(raise_exception=False):
+                for file_path in file_paths[start : start + batch_size]:
+                    self.bucket.blob(file_path).delete()
+
+    def _check_crc32c(self, file_path, parts, crc32c):
+        """
+        Check downloaded data against the CRC32C checksum of the file.
+
+        Args:
+            file_path: The path to the file in the bucket
+            parts: Iterable of bytes making up the file
+            crc32c: Base64 encoded checksum, nothing is checked if None
+        """
+        if not crc32c:
+            return
+
+        checksum = google_crc32c.Checksum()
+        for part in parts:
+            checksum.update(part)
+        if checksum.digest() != base64.b64decode(crc32c):
+            raise IOError(f"Checksum mismatch downloading {file_path}")
+
     def _get_content_type(self, file_format):
         """
         Get the content type for a file format.
@@ -120,9 +351,11 @@ class CloudStorageService:
         content_types = {
             "json": "application/json",
             "csv": "text/csv",
+            "ndjson": "application/x-ndjson",
             "excel": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             "xls": "application/vnd.ms-excel",
+            "txt": "text/plain",
         }
 
         return content_types.get(file_format.lower(), "application/octet-stream")
@@ -71,7 +71,13 @@ class CloudTasksService:
         return self.client.create_task(request={"parent": self.parent, "task": task})
 
     def create_transform_task(
-        self, job_id, source_format, target_format, source_path, config=None
+        self,
+        job_id,
+        source_format,
+        target_format,
+        source_path,
+        config=None,
+        target_formats=None,
     ):
         """
         Create a transformation task.
@@ -82,6 +88,8 @@ class CloudTasksService:
             target_format: The target file format
             source_path: Path to the source file in Cloud Storage
             config: Optional transformation configuration
+            target_formats: Optional list of all target formats for
+                            multi-target jobs
 
         Returns:
             The created task
@@ -101,5 +109,9 @@ class CloudTasksService:
         if config:
             payload["config"] = config
 
+        # Add all targets for multi-target jobs
+        if target_formats:
+            payload["target_formats"] = target_formats
+
         # Create task with the job_id as the task name for idempotency
         return self.create_task(url, payload, task_name=job_id)
@@ -1,6 +1,8 @@
 import csv
 from io import StringIO
-import json
+
+from app.utils import json_converter
+from app.utils.filters import compile_predicate, compile_projection
 
 
 def to_json(data, config=None):
@@ -8,30 +10,141 @@ def to_json(data, config=None):
     Convert CSV data to JSON format
 
     Args:
-        data: CSV data as a string
+        data: CSV data as a string or text file-like object
         config: Optional configuration dictionary containing:
                - delimiter: CSV delimiter (default ',')
+               - quotechar: CSV quote character (default '"')
                - fields: List of fields to force specific field names
                - array: Boolean to force array output even for single row (default False)
+               - select: List of columns to keep (default all)
+               - where: Row filter, see filters.compile_predicate
+    """
+    return json_converter.write_records(read_records(data, config), config)
+
+
+def read_records(data, config=None):
+    """
+    Read CSV data as a stream of records
+
+    Args:
+        data: CSV data as a string or text file-like object
+        config: Optional configuration dictionary, see to_json
+
+    Returns:
+        An iterator of dictionaries, one per row
     """
     # Get configuration options
     config = config or {}
     delimiter = config.get("delimiter", ",")
-    force_array = config.get("array", False)
+    quotechar = config.get("quotechar", '"')
+
+    # Create CSV reader from string input, streams are read line by line
+    input_file = StringIO(data) if isinstance(data, str) else data
+
+    if config.get("select") or config.get("where"):
+        # Filter and project on the raw parsed rows
+        return _read_filtered(input_file, delimiter, quotechar, config)
 
-    # Create CSV reader from string input
-    input_file = StringIO(data)
-    reader = csv.DictReader(input_file, delimiter=delimiter)
+    reader = csv.DictReader(input_file, delimiter=delimiter, quotechar=quotechar)
 
     # If fields are specified in config, override the fieldnames
     if "fields" in config:
         reader.fieldnames = config["fields"]
 
-    # Convert CSV rows to list of dictionaries
-    result = list(reader)
+    return reader
+
+
+def write_records(records, config=None, output=None):
+    """
+    Write a stream of records as CSV
+
+    Args:
+        records: Iterable of dictionaries
+        config: Optional configuration dictionary containing:
+               - fields: List of fields to include in CSV
+               - delimiter: CSV delimiter (default ',')
+               - headers: Boolean to include headers (default True)
+               - select: List of fields to keep (takes precedence over fields)
+        output: Optional text stream to write to, opened with newline=''
+
+    Returns:
+        The CSV text, or None when written to output
+    """
+    # Build a string unless writing to a stream
+    if output is None:
+        output = StringIO()
+        write_records(records, config, output)
+        return output.getvalue()
+
+    # Get configuration options
+    config = config or {}
+    delimiter = config.get("delimiter", ",")
+    include_headers = config.get("headers", True)
+
+    # If fields are specified in config, use those
+    # Otherwise, get all unique fields from the data
+    if config.get("select"):
+        fieldnames = config["select"]
+    elif "fields" in config:
+        fieldnames = config["fields"]
+    else:
+        records = list(records)
+        fieldnames = set()
+        for item in records:
+            fieldnames.update(item.keys())
+        fieldnames = sorted(list(fieldnames))
+
+    writer = csv.DictWriter(
+        output, fieldnames=fieldnames, delimiter=delimiter, extrasaction="ignore"
+    )
+
+    # Write headers if configured
+    if include_headers:
+        writer.writeheader()
+
+    # Write data rows, only the selected fields are read from each item
+    writer.writerows(records)
+
+
+def _read_filtered(input_file, delimiter, quotechar, config):
+    """
+    Read CSV rows applying the ``where`` and ``select`` options
+
+    Rows are tested on the raw list produced by the CSV parser, so rejected
+    rows and unselected columns are never turned into dictionaries.
+
+    Args:
+        input_file: File-like object with the CSV text
+        delimiter: CSV delimiter
+        quotechar: CSV quote character
+        config: Transformation configuration
+
+    Yields:
+        A dictionary for each kept row, holding only the selected columns
+    """
+    reader = csv.reader(input_file, delimiter=delimiter, quotechar=quotechar)
+
+    # If fields are specified in config, the first row is data
+    if "fields" in config:
+        fieldnames = list(config["fields"])
+    else:
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return
+
+    # Compile the filter and the projection once for the whole file
+    predicate = compile_predicate(config.get("where"), fieldnames)
+    projection = compile_projection(config.get("select") or fieldnames, fieldnames)
 
-    # If there's only one row and force_array is False, return just the object
-    if len(result) == 1 and not force_array:
-        return json.dumps(result[0])
+    for row in reader:
+        # Skip blank lines like csv.DictReader does
+        if not row:
+            continue
+        if predicate is not None and not predicate(row):
+            continue
 
-    return json.dumps(result)
+        size = len(row)
+        yield {
+            name: row[index] if index is not None and index < size else None
+            for name, index in projection
+        }
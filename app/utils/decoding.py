@@ -0,0 +1,152 @@
+import codecs
+import csv
+import io
+
+
+# Number of bytes used to detect the encoding and the CSV dialect
+SAMPLE_SIZE = 64 * 1024
+
+# Byte order marks, longest first since the UTF-32 LE mark starts with the
+# UTF-16 LE one
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Delimiters considered when sniffing a CSV dialect
+CSV_DELIMITERS = ",;\t|"
+
+
+def detect_encoding(sample):
+    """
+    Detect the text encoding of a file from its first bytes
+
+    Args:
+        sample: The first bytes of the file
+
+    Returns:
+        The name of a codec able to decode the file, which also strips the
+        byte order mark if there is one
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+
+    # UTF-16 without a byte order mark shows up as NUL bytes next to
+    # every ASCII character
+    if b"\x00" in sample:
+        even_nuls = sample[0::2].count(0)
+        odd_nuls = sample[1::2].count(0)
+        if odd_nuls > even_nuls:
+            return "utf-16-le"
+        if even_nuls > odd_nuls:
+            return "utf-16-be"
+
+    for encoding in ("utf-8", "cp1252"):
+        try:
+            # Not final, the sample may end inside a multibyte character
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+
+    # Latin-1 decodes any byte sequence
+    return "latin-1"
+
+
+def decode_sample(sample, encoding):
+    """
+    Decode the first bytes of a file, ignoring a cut off trailing character
+
+    Args:
+        sample: The first bytes of the file
+        encoding: The encoding of the file
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    return decoder.decode(sample, final=False)
+
+
+def sniff_csv(sample):
+    """
+    Detect the delimiter and quoting of a CSV file from its first lines
+
+    Args:
+        sample: The beginning of the CSV text
+
+    Returns:
+        A configuration dictionary with 'delimiter' and 'quotechar', or an
+        empty dictionary if the dialect could not be detected
+    """
+    # Leave out the last line, which may be cut off
+    if "\n" in sample:
+        sample = sample[: sample.rfind("\n")]
+
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
+    except csv.Error:
+        return {}
+
+    return {"delimiter": dialect.delimiter, "quotechar": dialect.quotechar}
+
+
+def open_source(content, file_format, config=None):
+    """
+    Open downloaded file content as text for a converter
+
+    The content is decoded in chunks as the converter reads it, instead of
+    making a decoded copy of the whole file up front.
+
+    Args:
+        content: The file data as any bytes-like object
+        file_format: The file format (json, csv, ndjson)
+        config: Optional configuration dictionary containing:
+               - encoding: Encoding of the file (default detected)
+               - delimiter: CSV delimiter (default detected)
+
+    Returns:
+        A tuple of the text stream and the configuration, completed with
+        the detected CSV dialect
+    """
+    config = dict(config or {})
+    sample = bytes(content[:SAMPLE_SIZE])
+    encoding = config.get("encoding") or detect_encoding(sample)
+
+    # Only fill in the options the config does not set
+    if file_format == "csv" and "delimiter" not in config:
+        for key, value in sniff_csv(decode_sample(sample, encoding)).items():
+            config.setdefault(key, value)
+
+    # Read the content in place, io.BytesIO would copy a bytearray
+    buffer = io.BufferedReader(BufferReader(content))
+    stream = io.TextIOWrapper(buffer, encoding=encoding, newline="")
+    return stream, config
+
+
+class BufferReader(io.RawIOBase):
+    """Readable byte stream over an existing buffer, without copying it."""
+
+    def __init__(self, content):
+        """
+        Initialize the reader
+
+        Args:
+            content: Any bytes-like object
+        """
+        self._view = memoryview(content)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self._view) - self._position)
+        buffer[:size] = self._view[self._position : self._position + size]
+        self._position += size
+        return size
+
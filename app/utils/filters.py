@@ -0,0 +1,168 @@
+import operator
+
+
+# Comparison operators supported in a ``where`` clause
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda value, options: value in options,
+    "not_in": lambda value, options: value not in options,
+    "contains": lambda value, part: value is not None and part in value,
+}
+
+# Operators comparing a field against a list of values
+LIST_OPERATORS = ("in", "not_in")
+
+# Operators matching the values that differ from the expected one
+NEGATED_OPERATORS = ("ne", "not_in")
+
+
+def compile_predicate(where, columns=None):
+    """
+    Compile a ``where`` clause into a single row predicate
+
+    The clause is compiled once per job so that evaluating a row is a plain
+    function call, without re-reading the clause for every record.
+
+    Args:
+        where: Either a dictionary of ``{field: value}`` equality checks, or a
+               list of conditions, each a dictionary containing:
+               - field: Name of the field to test
+               - op: Operator name (eq, ne, gt, gte, lt, lte, in, not_in,
+                     contains; default 'eq')
+               - value: Value to compare the field against
+               All conditions must match for a row to be kept.
+        columns: Optional list of column names. When given, the predicate
+                 accepts positional rows (lists) laid out in this order,
+                 otherwise it accepts dictionaries.
+
+    Fields missing from a row, or from ``columns``, read as None, the same
+    for every input format. A value that cannot be compared against the
+    expected one, e.g. an empty CSV cell against a number, only matches the
+    ne and not_in operators.
+
+    Returns:
+        A callable taking a row and returning True if the row is kept,
+        or None if there is nothing to filter on
+    """
+    if not where:
+        return None
+
+    if isinstance(where, dict):
+        where = [{"field": field, "value": value} for field, value in where.items()]
+    elif not isinstance(where, list):
+        raise ValueError("Invalid where clause: expected an object or a list")
+
+    checks = [_compile_condition(condition, columns) for condition in where]
+
+    if len(checks) == 1:
+        return checks[0]
+
+    return lambda row: all(check(row) for check in checks)
+
+
+def compile_projection(select, columns):
+    """
+    Resolve a ``select`` list against the columns of a positional reader
+
+    Args:
+        select: List of column names to keep, in output order
+        columns: List of column names available in the input
+
+    Returns:
+        A list of ``(name, index)`` pairs for the selected columns, the
+        index is None for a column missing from the input
+    """
+    return [(name, _column_index(name, columns)) for name in select]
+
+
+def _compile_condition(condition, columns):
+    """
+    Compile one ``where`` condition into a row predicate
+
+    Args:
+        condition: Dictionary with 'field', 'op' and 'value' keys
+        columns: Optional list of column names for positional rows
+    """
+    if not isinstance(condition, dict):
+        raise ValueError(f"Invalid where condition: {condition}")
+
+    field = condition.get("field")
+    op_name = condition.get("op", "eq")
+    expected = condition.get("value")
+
+    if field is None:
+        raise ValueError(f"Missing field in where condition: {condition}")
+    if op_name not in OPERATORS:
+        raise ValueError(f"Unsupported where operator: {op_name}")
+    if op_name in LIST_OPERATORS and not isinstance(expected, (list, tuple, set)):
+        raise ValueError(f"The {op_name} operator expects a list of values")
+
+    compare = OPERATORS[op_name]
+    # A value that cannot be compared is never equal to the expected one
+    unmatched = op_name in NEGATED_OPERATORS
+    get_value = _compile_getter(field, columns)
+    coerce = _compile_coercion(expected)
+
+    def check(row):
+        try:
+            return compare(coerce(get_value(row)), expected)
+        except (TypeError, ValueError):
+            # Values that cannot be compared (e.g. an empty or non-numeric
+            # cell against a number) only match the negated operators
+            return unmatched
+
+    return check
+
+
+def _compile_getter(field, columns):
+    """Build an accessor returning the value of a field from a row"""
+    if columns is None:
+        return lambda row: row.get(field)
+
+    index = _column_index(field, columns)
+    if index is None:
+        return lambda row: None
+    return lambda row: row[index] if index < len(row) else None
+
+
+def _compile_coercion(expected):
+    """
+    Build a converter bringing a raw field value to the type of the
+    expected value, so that CSV text can be compared against numbers
+    """
+    sample = expected
+    if isinstance(expected, (list, tuple, set)) and expected:
+        sample = next(iter(expected))
+
+    if isinstance(sample, bool):
+        return lambda value: (
+            value
+            if isinstance(value, bool) or value is None
+            else str(value).strip().lower() in ("true", "1", "yes")
+        )
+    if isinstance(sample, (int, float)):
+        return lambda value: (
+            value
+            if isinstance(value, (int, float)) or value is None
+            else float(value)
+        )
+
+    return lambda value: value
+
+
+def _column_index(name, columns):
+    """
+    Get the position of a column, or None if it does not exist
+
+    A missing column reads as None like a missing key in a JSON record,
+    so that select and where behave the same for every input format.
+    """
+    try:
+        return columns.index(name)
+    except ValueError:
+        return None
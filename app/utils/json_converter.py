@@ -1,7 +1,10 @@
+import itertools
 import json
-import csv
 from io import StringIO
 
+from app.utils import csv_converter
+from app.utils.filters import compile_predicate
+
 
 def to_csv(data, config=None):
     """
@@ -13,41 +16,140 @@ def to_csv(data, config=None):
                - fields: List of fields to include in CSV
                - delimiter: CSV delimiter (default ',')
                - headers: Boolean to include headers (default True)
+               - select: List of fields to keep (takes precedence over fields)
+               - where: Row filter, see filters.compile_predicate
+    """
+    return csv_converter.write_records(read_records(data, config), config)
+
+
+def read_records(data, config=None):
+    """
+    Read JSON data as a stream of records
+
+    Args:
+        data: JSON data (a string, a text file-like object or a parsed
+              JSON object)
+        config: Optional configuration dictionary, see to_csv
+
+    Returns:
+        An iterator of dictionaries, one per item
     """
-    # Parse JSON if it's a string
+    # Parse JSON if it's a string or a stream
     if isinstance(data, str):
         data = json.loads(data)
+    elif hasattr(data, "read"):
+        data = json.load(data)
 
     # Ensure data is a list of dictionaries
     if not isinstance(data, list):
         data = [data]
 
-    # Get configuration options
     config = config or {}
-    delimiter = config.get("delimiter", ",")
-    include_headers = config.get("headers", True)
-
-    # If fields are specified in config, use those
-    # Otherwise, get all unique fields from the data
-    if "fields" in config:
-        fieldnames = config["fields"]
-    else:
-        fieldnames = set()
-        for item in data:
-            fieldnames.update(item.keys())
-        fieldnames = sorted(list(fieldnames))
-
-    # Create string buffer for CSV output
-    output = StringIO()
-    writer = csv.DictWriter(
-        output, fieldnames=fieldnames, delimiter=delimiter, extrasaction="ignore"
-    )
-
-    # Write headers if configured
-    if include_headers:
-        writer.writeheader()
-
-    # Write data rows
-    writer.writerows(data)
-
-    return output.getvalue()
+    records = iter(data)
+
+    # Drop rows failing the where clause before anything else touches them
+    predicate = compile_predicate(config.get("where"))
+    if predicate is not None:
+        records = filter(predicate, records)
+
+    # Keep only the selected fields
+    select = config.get("select")
+    if select:
+        records = ({name: item.get(name) for name in select} for item in records)
+
+    return records
+
+
+def read_prefix(data):
+    """
+    Read the complete items at the start of a possibly truncated JSON text
+
+    Args:
+        data: The beginning of a JSON document, either a single object or
+              an array of objects
+
+    Yields:
+        Each item that is fully contained in the text
+    """
+    decoder = json.JSONDecoder()
+    text = data.lstrip()
+
+    # A single object is only usable once it is complete
+    if not text.startswith("["):
+        try:
+            item, _ = decoder.raw_decode(text)
+        except ValueError:
+            return
+        yield item
+        return
+
+    position = 1
+    while True:
+        position = _skip_whitespace(text, position)
+        if position >= len(text) or text[position] == "]":
+            return
+
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            # The item is cut off by the end of the text
+            return
+
+        # The item is complete only if a separator follows it, otherwise
+        # e.g. a number may continue past the end of the text
+        position = _skip_whitespace(text, position)
+        if position >= len(text):
+            return
+        yield item
+
+        if text[position] == ",":
+            position += 1
+
+
+def write_records(records, config=None, output=None):
+    """
+    Write a stream of records as JSON
+
+    Records are written one at a time, the output is the same as dumping
+    the list of records at once.
+
+    Args:
+        records: Iterable of dictionaries
+        config: Optional configuration dictionary containing:
+               - array: Boolean to force array output even for single row (default False)
+        output: Optional text stream to write to
+
+    Returns:
+        The JSON text, or None when written to output
+    """
+    # Build a string unless writing to a stream
+    if output is None:
+        output = StringIO()
+        write_records(records, config, output)
+        return output.getvalue()
+
+    config = config or {}
+    force_array = config.get("array", False)
+
+    # Read ahead enough to know if there is a single row
+    records = iter(records)
+    head = list(itertools.islice(records, 2))
+
+    # If there's only one row and force_array is False, write just the object
+    if len(head) == 1 and not force_array:
+        output.write(json.dumps(head[0]))
+        return
+
+    output.write("[")
+    for index, record in enumerate(itertools.chain(head, records)):
+        if index:
+            output.write(", ")
+        output.write(json.dumps(record))
+    output.write("]")
+
+
+def _skip_whitespace(text, position):
+    """Get the position of the next non-whitespace character"""
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    return position
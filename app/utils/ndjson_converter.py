@@ -0,0 +1,122 @@
+import json
+from io import StringIO
+
+from app.utils import csv_converter, json_converter
+from app.utils.filters import compile_predicate
+
+
+def to_json(data, config=None):
+    """
+    Convert NDJSON data to JSON format
+
+    Args:
+        data: NDJSON data as a string or text file-like object
+        config: Optional configuration dictionary, see read_records and
+               json_converter.write_records
+    """
+    return json_converter.write_records(read_records(data, config), config)
+
+
+def to_csv(data, config=None):
+    """
+    Convert NDJSON data to CSV format
+
+    Args:
+        data: NDJSON data as a string or text file-like object
+        config: Optional configuration dictionary, see read_records and
+               csv_converter.write_records
+    """
+    return csv_converter.write_records(read_records(data, config), config)
+
+
+def from_json(data, config=None):
+    """
+    Convert JSON data to NDJSON format
+
+    Args:
+        data: JSON data (a string, a text file-like object or a parsed
+              JSON object)
+        config: Optional configuration dictionary, see json_converter.read_records
+    """
+    return write_records(json_converter.read_records(data, config), config)
+
+
+def from_csv(data, config=None):
+    """
+    Convert CSV data to NDJSON format
+
+    Args:
+        data: CSV data as a string or text file-like object
+        config: Optional configuration dictionary, see csv_converter.read_records
+    """
+    return write_records(csv_converter.read_records(data, config), config)
+
+
+def read_records(data, config=None):
+    """
+    Read NDJSON data as a stream of records
+
+    Each line is parsed on its own as it is read, so only one record is in
+    memory at a time.
+
+    Args:
+        data: NDJSON data as a string or text file-like object
+        config: Optional configuration dictionary containing:
+               - select: List of fields to keep (default all)
+               - where: Row filter, see filters.compile_predicate
+
+    Yields:
+        A dictionary for each line
+    """
+    config = config or {}
+    lines = StringIO(data) if isinstance(data, str) else data
+
+    # Compile the filter once for the whole file
+    predicate = compile_predicate(config.get("where"))
+    select = config.get("select")
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+
+        if not isinstance(item, dict):
+            raise ValueError(
+                f"Invalid JSON on line {line_number}: expected an object"
+            )
+
+        if predicate is not None and not predicate(item):
+            continue
+        if select:
+            item = {name: item.get(name) for name in select}
+
+        yield item
+
+
+def write_records(records, config=None, output=None):
+    """
+    Write a stream of records as NDJSON
+
+    Args:
+        records: Iterable of dictionaries
+        config: Optional configuration dictionary (unused)
+        output: Optional text stream to write to
+
+    Returns:
+        The NDJSON text, or None when written to output
+    """
+    # Build a string unless writing to a stream
+    if output is None:
+        output = StringIO()
+        write_records(records, config, output)
+        return output.getvalue()
+
+    # One compact JSON document per line
+    for record in records:
+        output.write(json.dumps(record))
+        output.write("\n")
@@ -0,0 +1,113 @@
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import tracemalloc
+
+
+# Number of functions and allocation sites listed in a summary
+SUMMARY_TOP_ENTRIES = 30
+
+# Number of frames stored for each traced allocation
+TRACEMALLOC_FRAMES = 10
+
+# cProfile and tracemalloc are process wide, only one job is profiled at a time
+_profiling_lock = threading.Lock()
+
+
+class JobProfiler:
+    """Context manager capturing a CPU profile and memory allocations."""
+
+    def __init__(self, enabled=True):
+        """
+        Initialize the profiler
+
+        Args:
+            enabled: Whether to profile, a disabled profiler does nothing
+        """
+        self.enabled = enabled
+        self.captured = False
+        self.peak_memory = None
+        self._profiler = None
+        self._allocations = []
+        self._locked = False
+
+    def __enter__(self):
+        # Skip profiling rather than wait while another job is profiled
+        if not self.enabled or not _profiling_lock.acquire(blocking=False):
+            return self
+        self._locked = True
+
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._locked:
+            return False
+
+        try:
+            self._profiler.disable()
+
+            # Most of the job's memory is freed by now, the allocations are
+            # only a fallback for jobs that did not capture them earlier
+            if not self._allocations:
+                self.capture_allocations()
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            self.captured = True
+        finally:
+            tracemalloc.stop()
+            _profiling_lock.release()
+            self._locked = False
+
+        return False
+
+    def capture_allocations(self):
+        """
+        Record the largest allocation sites alive at this point
+
+        Call it where the job holds the most memory, e.g. once the outputs
+        are built and before the source is released, since a snapshot at
+        the end of the job only shows what outlives it.
+        """
+        if not self._locked:
+            return
+
+        # Summarize allocations right away so the snapshot is not kept
+        snapshot = tracemalloc.take_snapshot()
+        self._allocations = [
+            str(stat) for stat in snapshot.statistics("lineno")[:SUMMARY_TOP_ENTRIES]
+        ]
+
+    def profile_data(self):
+        """
+        Get the CPU profile
+
+        Returns:
+            The profile as bytes, in the format read by pstats and snakeviz
+        """
+        self._profiler.create_stats()
+        return marshal.dumps(self._profiler.stats)
+
+    def summary(self):
+        """
+        Get a readable summary of the profile
+
+        Returns:
+            The slowest functions by cumulative time and the largest
+            allocation sites at the point they were captured
+        """
+        output = io.StringIO()
+        output.write(f"Peak traced memory: {self.peak_memory} bytes\n\n")
+
+        output.write(f"Top {SUMMARY_TOP_ENTRIES} allocation sites:\n")
+        for line in self._allocations:
+            output.write(f"{line}\n")
+        output.write("\n")
+
+        stats = pstats.Stats(self._profiler, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_TOP_ENTRIES)
+
+        return output.getvalue()
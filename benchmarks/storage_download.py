@@ -0,0 +1,174 @@
+"""
+Benchmark Cloud Storage downloads against a local stand-in server
+
+Compares a single sequential download_as_bytes call with the sliced
+parallel download of CloudStorageService.download_file. The stand-in
+server throttles each connection to emulate the per-stream throughput
+cap seen with large blobs.
+
+Usage:
+    python -m benchmarks.storage_download --size-mb 256 --stream-mbps 50
+"""
+
+import argparse
+import base64
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+import google_crc32c
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+
+from app.config import settings
+from app.utils.cloud_storage import CloudStorageService, create_http_session
+
+
+OBJECT_NAME = "uploads/benchmark.csv"
+
+
+def make_handler(data, stream_bytes_per_second):
+    """
+    Build a request handler serving one object through the JSON API paths
+
+    Args:
+        data: The object content
+        stream_bytes_per_second: Throughput cap per connection
+    """
+    crc32c = base64.b64encode(google_crc32c.Checksum(data).digest()).decode()
+    metadata = {
+        "kind": "storage#object",
+        "name": OBJECT_NAME,
+        "bucket": settings.GCP_STORAGE_BUCKET,
+        "generation": "1",
+        "metageneration": "1",
+        "size": str(len(data)),
+        "crc32c": crc32c,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            path = unquote(url.path)
+
+            if path.startswith("/download/"):
+                self._send_media()
+            elif path.endswith(f"/o/{OBJECT_NAME}"):
+                self._send(200, json.dumps(metadata).encode(), "application/json")
+            else:
+                self._send(404, b"{}", "application/json")
+
+        def _send_media(self):
+            start, end = 0, len(data) - 1
+            match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            status = 200
+            if match:
+                status = 206
+                start = int(match.group(1))
+                end = min(int(match.group(2) or end), end)
+
+            headers = {"x-goog-generation": "1"}
+            if status == 200:
+                headers["x-goog-hash"] = f"crc32c={crc32c}"
+            else:
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+
+            self._send(status, memoryview(data)[start : end + 1], headers=headers)
+
+        def _send(self, status, body, content_type=None, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            if content_type:
+                self.send_header("Content-Type", content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+
+            # Write in small pieces, sleeping to hold the per-stream cap
+            chunk_size = 256 * 1024
+            started = time.perf_counter()
+            for offset in range(0, len(body), chunk_size):
+                self.wfile.write(body[offset : offset + chunk_size])
+                if stream_bytes_per_second:
+                    ahead = (offset + chunk_size) / stream_bytes_per_second - (
+                        time.perf_counter() - started
+                    )
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return Handler
+
+
+def measure(label, download, size):
+    """Run a download, print and return its throughput in MB/s"""
+    started = time.perf_counter()
+    result = download()
+    elapsed = time.perf_counter() - started
+
+    if len(result) != size:
+        raise RuntimeError(f"{label}: got {len(result)} bytes, expected {size}")
+
+    throughput = size / elapsed / (1024 * 1024)
+    print(f"{label:<40} {elapsed:8.2f} s {throughput:10.1f} MB/s")
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--stream-mbps", type=float, default=50)
+    parser.add_argument("--slice-mb", type=int, default=settings.GCS_DOWNLOAD_SLICE_MB)
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.GCS_DOWNLOAD_CONCURRENCY
+    )
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    data = os.urandom(size)
+
+    handler = make_handler(data, args.stream_mbps * 1024 * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    credentials = AnonymousCredentials()
+    client = storage.Client(
+        project="benchmark",
+        credentials=credentials,
+        client_options={"api_endpoint": endpoint},
+        _http=create_http_session(credentials, args.concurrency),
+    )
+    service = CloudStorageService(client=client)
+    service.download_slice_size = args.slice_mb * 1024 * 1024
+    service.download_concurrency = args.concurrency
+
+    print(
+        f"{args.size_mb} MB object, {args.stream_mbps} MB/s per stream, "
+        f"{args.slice_mb} MB slices, {args.concurrency} concurrent"
+    )
+    baseline = measure(
+        "blob.download_as_bytes (sequential)",
+        lambda: service.bucket.blob(OBJECT_NAME).download_as_bytes(),
+        size,
+    )
+    sliced = measure(
+        "CloudStorageService.download_file",
+        lambda: service.download_file(OBJECT_NAME),
+        size,
+    )
+    print(f"Speedup: {sliced / baseline:.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
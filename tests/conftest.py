@@ -0,0 +1,21 @@
+import os
+from unittest import mock
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def main_module():
+    """The application module, imported with the Google Cloud clients faked"""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("psycopg2")
+    pytest.importorskip("google.cloud.tasks_v2")
+    from google.auth.credentials import AnonymousCredentials
+
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "test-project")
+    with mock.patch(
+        "google.auth.default", return_value=(AnonymousCredentials(), "test-project")
+    ), mock.patch("google.cloud.tasks_v2.CloudTasksClient"):
+        from app import main
+
+    return main
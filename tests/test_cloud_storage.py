@@ -0,0 +1,218 @@
+import base64
+import io
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("google.cloud.storage")
+pytest.importorskip("pydantic_settings")
+
+import google_crc32c  # noqa: E402
+from google.api_core.exceptions import (  # noqa: E402
+    NotFound,
+    PreconditionFailed,
+    RequestRangeNotSatisfiable,
+)
+
+from app.utils.cloud_storage import CloudStorageService  # noqa: E402
+
+
+class FakeBlob:
+    """Blob stand-in serving ranged reads of one stored object."""
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.size = None
+        self.generation = None
+        self.crc32c = None
+
+    def download_as_bytes(self, start, end, checksum, if_generation_match=None):
+        self.store.record(("download", start, end, if_generation_match))
+        if self.name not in self.store.objects:
+            raise NotFound(self.name)
+
+        data, generation = self.store.objects[self.name]
+        if self.store.on_download:
+            self.store.on_download()
+        if if_generation_match is not None and if_generation_match != generation:
+            raise PreconditionFailed("generation changed")
+        if start >= len(data):
+            raise RequestRangeNotSatisfiable("range")
+
+        # Like the library, keep the generation from the response headers
+        self.generation = generation
+        return data[start : end + 1]
+
+    def open(self, mode, encoding, newline, chunk_size, content_type):
+        writer = FakeWriter(self.store, self.name)
+        return io.TextIOWrapper(writer, encoding=encoding, newline=newline)
+
+
+class FakeWriter(io.BytesIO):
+    """Resumable upload stand-in storing the object when it is finished."""
+
+    def __init__(self, store, name):
+        super().__init__()
+        self.store = store
+        self.name = name
+        self.terminated = False
+
+    def close(self):
+        if not self.closed:
+            self.store.objects[self.name] = (self.getvalue(), 1)
+        super().close()
+
+    def terminate(self):
+        self.terminated = True
+        super().close()
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.requests = []
+        self.on_metadata = None
+        self.on_download = None
+        self._lock = threading.Lock()
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def get_blob(self, name):
+        self.record(("metadata",))
+        if self.on_metadata:
+            self.on_metadata()
+        if name not in self.objects:
+            return None
+
+        data, generation = self.objects[name]
+        blob = FakeBlob(self, name)
+        blob.size = len(data)
+        blob.generation = generation
+        blob.crc32c = self.crc32c(data)
+        return blob
+
+    def record(self, request):
+        with self._lock:
+            self.requests.append(request)
+
+    @staticmethod
+    def crc32c(data):
+        return base64.b64encode(google_crc32c.Checksum(data).digest()).decode()
+
+
+class FakeClient:
+    def __init__(self):
+        self.fake_bucket = FakeBucket()
+
+    def bucket(self, name):
+        return self.fake_bucket
+
+
+@pytest.fixture
+def service():
+    service = CloudStorageService(client=FakeClient())
+    service.download_slice_size = 1000
+    service.download_concurrency = 4
+    return service
+
+
+def test_small_file_takes_a_single_request(service):
+    service.bucket.objects["small.csv"] = (b"a,b\n1,2\n", 7)
+
+    assert service.download_file("small.csv") == b"a,b\n1,2\n"
+    assert sorted(service.bucket.requests) == [
+        ("download", 0, 999, None),
+        ("metadata",),
+    ]
+
+
+def test_empty_file(service):
+    service.bucket.objects["empty.csv"] = (b"", 1)
+
+    assert service.download_file("empty.csv") == b""
+
+
+def test_large_file_is_downloaded_in_slices(service):
+    data = os.urandom(4500)
+    service.bucket.objects["large.csv"] = (data, 7)
+
+    assert service.download_file("large.csv") == data
+
+    assert sorted(service.bucket.requests) == [
+        ("download", 0, 999, None),
+        ("download", 1000, 1999, 7),
+        ("download", 2000, 2999, 7),
+        ("download", 3000, 3999, 7),
+        ("download", 4000, 4499, 7),
+        ("metadata",),
+    ]
+
+
+@pytest.mark.parametrize("size", [0, 500, 4500])
+def test_download_into_an_allocated_buffer(service, size):
+    data = os.urandom(size)
+    service.bucket.objects["file.csv"] = (data, 7)
+    buffers = []
+
+    def allocate(size):
+        buffers.append(bytearray(size))
+        return memoryview(buffers[-1])
+
+    content = service.download_file("file.csv", allocate=allocate)
+
+    assert bytes(content) == data
+    assert buffers == [bytearray(data)]
+
+
+@pytest.mark.parametrize("size", [500, 2500])
+def test_file_replaced_while_downloading(service, size):
+    service.bucket.objects["file.csv"] = (os.urandom(size), 7)
+    first_slice_read = threading.Event()
+
+    def replace():
+        # Swap the file once the first slice was read at the old generation
+        first_slice_read.wait(5)
+        service.bucket.objects["file.csv"] = (os.urandom(size), 8)
+
+    service.bucket.on_metadata = replace
+    service.bucket.on_download = first_slice_read.set
+
+    with pytest.raises(IOError, match="File replaced"):
+        service.download_file("file.csv")
+
+
+def test_missing_file(service):
+    with pytest.raises(NotFound):
+        service.download_file("missing.csv")
+
+
+def test_checksum_mismatch(service):
+    service.bucket.objects["small.csv"] = (b"a,b\n", 7)
+    service.bucket.crc32c = lambda data: FakeBucket.crc32c(b"other")
+
+    with pytest.raises(IOError, match="Checksum mismatch"):
+        service.download_file("small.csv")
+
+
+def test_upload_is_finished_on_close(service):
+    file_path, stream = service.open_upload("csv", prefix="results")
+    stream.write("id,name\r\n1,Zoë\r\n")
+    stream.close()
+
+    assert file_path.startswith("results/") and file_path.endswith(".csv")
+    assert service.bucket.objects[file_path] == ("id,name\r\n1,Zoë\r\n".encode(), 1)
+
+
+def test_aborted_upload_leaves_no_file(service):
+    file_path, stream = service.open_upload("csv")
+    writer = stream.buffer
+    stream.write("id\n1\n")
+
+    service.abort_upload(stream)
+    del stream
+
+    assert writer.terminated
+    assert file_path not in service.bucket.objects
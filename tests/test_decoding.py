@@ -0,0 +1,75 @@
+import codecs
+
+import pytest
+
+from app.utils.decoding import (
+    BufferReader,
+    detect_encoding,
+    open_source,
+    sniff_csv,
+)
+
+
+@pytest.mark.parametrize(
+    "data, encoding",
+    [
+        (codecs.BOM_UTF8 + "a,b".encode(), "utf-8-sig"),
+        ("a,b".encode("utf-16"), "utf-16"),
+        ("a,b".encode("utf-32"), "utf-32"),
+        ("a,b\n".encode("utf-16-le"), "utf-16-le"),
+        ("a,b\n".encode("utf-16-be"), "utf-16-be"),
+        ("Zoë,Zoé".encode("utf-8"), "utf-8"),
+        ("café €5".encode("cp1252"), "cp1252"),
+        (bytes([0x81, 0x8D, 0x8F]), "latin-1"),
+    ],
+)
+def test_detect_encoding(data, encoding):
+    assert detect_encoding(data) == encoding
+
+
+def test_detect_encoding_ignores_a_character_cut_off_by_the_sample():
+    sample = "aé".encode("utf-8")[:-1]
+
+    assert detect_encoding(sample) == "utf-8"
+
+
+def test_sniff_csv():
+    sample = 'id;name\n1;"Smith; John"\n2;Doe\n3;Cut o'
+
+    assert sniff_csv(sample) == {"delimiter": ";", "quotechar": '"'}
+    assert sniff_csv("") == {}
+
+
+def test_buffer_reader_reads_in_place():
+    content = bytearray(b"0123456789")
+    reader = BufferReader(content)
+
+    assert reader.read(4) == b"0123"
+    assert reader.tell() == 4
+    content[4] = ord("x")
+    assert reader.read() == b"x56789"
+    assert reader.read(1) == b""
+
+
+def test_open_source_decodes_and_sniffs():
+    content = "id\tname\n1\tZoë\n".encode("utf-16")
+
+    stream, config = open_source(content, "csv", {"headers": True})
+
+    assert config == {"headers": True, "delimiter": "\t", "quotechar": '"'}
+    assert stream.read() == "id\tname\n1\tZoë\n"
+
+
+def test_open_source_keeps_configured_options():
+    stream, config = open_source(b"a|b\r\n", "csv", {"delimiter": "|"})
+
+    assert config == {"delimiter": "|"}
+    # Line endings are left to the CSV reader
+    assert stream.read() == "a|b\r\n"
+
+
+def test_open_source_keeps_a_configured_quotechar():
+    stream, config = open_source(b'a;b\n"x";2\n', "csv", {"quotechar": "'"})
+
+    assert config == {"quotechar": "'", "delimiter": ";"}
+
@@ -0,0 +1,129 @@
+import pytest
+
+from app.utils import csv_converter, json_converter
+from app.utils.filters import compile_predicate, compile_projection
+
+
+def test_no_where_clause_compiles_to_none():
+    assert compile_predicate(None) is None
+    assert compile_predicate([]) is None
+    assert compile_predicate({}) is None
+
+
+def test_equality_shorthand():
+    predicate = compile_predicate({"country": "FR", "active": True})
+
+    assert predicate({"country": "FR", "active": True})
+    assert not predicate({"country": "FR", "active": False})
+    assert not predicate({"country": "DE", "active": True})
+
+
+@pytest.mark.parametrize(
+    "op, value, kept",
+    [
+        ("eq", 10, [10]),
+        ("ne", 10, [5, 20]),
+        ("gt", 5, [10, 20]),
+        ("gte", 10, [10, 20]),
+        ("lt", 10, [5]),
+        ("lte", 10, [5, 10]),
+        ("in", [5, 20], [5, 20]),
+        ("not_in", [5, 20], [10]),
+    ],
+)
+def test_operators(op, value, kept):
+    predicate = compile_predicate([{"field": "n", "op": op, "value": value}])
+    rows = [{"n": n} for n in (5, 10, 20)]
+
+    assert [row["n"] for row in rows if predicate(row)] == kept
+
+
+def test_contains_skips_missing_values():
+    predicate = compile_predicate([{"field": "name", "op": "contains", "value": "li"}])
+
+    assert predicate({"name": "Alice"})
+    assert not predicate({"name": "Bob"})
+    assert not predicate({})
+
+
+def test_positional_rows_coerce_text_to_the_expected_type():
+    columns = ["id", "amount", "paid"]
+    predicate = compile_predicate(
+        [
+            {"field": "amount", "op": "gt", "value": 100},
+            {"field": "paid", "value": True},
+        ],
+        columns,
+    )
+
+    assert predicate(["1", "150.5", "true"])
+    assert not predicate(["2", "99", "true"])
+    assert not predicate(["3", "150", "no"])
+    # Values that cannot be converted never match
+    assert not predicate(["4", "n/a", "true"])
+    # Short rows read the missing cells as None
+    assert not predicate(["5"])
+
+
+@pytest.mark.parametrize(
+    "op, value, kept",
+    [
+        ("eq", 5, ["1"]),
+        ("ne", 5, ["2", "3", "4"]),
+        ("gt", 1, ["1"]),
+        ("in", [5, 7], ["1"]),
+        ("not_in", [5, 7], ["2", "3", "4"]),
+    ],
+)
+def test_csv_cells_that_are_not_numbers(op, value, kept):
+    data = "id,amount\n1,5\n2,\n3,x\n4\n"
+    config = {"where": [{"field": "amount", "op": op, "value": value}]}
+
+    records = csv_converter.read_records(data, config)
+
+    assert [record["id"] for record in records] == kept
+
+
+def test_invalid_conditions_raise():
+    with pytest.raises(ValueError, match="Missing field"):
+        compile_predicate([{"op": "eq", "value": 1}])
+    with pytest.raises(ValueError, match="Unsupported where operator"):
+        compile_predicate([{"field": "n", "op": "like", "value": 1}])
+    with pytest.raises(ValueError, match="Invalid where condition"):
+        compile_predicate(["n"])
+    with pytest.raises(ValueError, match="expects a list of values"):
+        compile_predicate([{"field": "n", "op": "in", "value": 5}])
+    with pytest.raises(ValueError, match="Invalid where clause"):
+        compile_predicate("n = 1")
+
+
+def test_projection_of_a_missing_column():
+    assert compile_projection(["b", "x"], ["a", "b"]) == [("b", 1), ("x", None)]
+
+
+def test_unknown_columns_read_as_none_in_every_format():
+    config = {
+        "select": ["id", "missing"],
+        "where": [{"field": "other", "op": "eq", "value": None}],
+    }
+
+    csv_records = list(csv_converter.read_records("id,name\n1,a\n", config))
+    json_records = list(json_converter.read_records('[{"id": "1"}]', config))
+
+    assert csv_records == json_records == [{"id": "1", "missing": None}]
+
+
+def test_csv_select_and_where():
+    data = "id,name,amount\n1,a,50\n2,b,150\n\n3,c,300\n"
+    config = {
+        "select": ["name", "id"],
+        "where": [{"field": "amount", "op": "gte", "value": 150}],
+    }
+
+    assert list(csv_converter.read_records(data, config)) == [
+        {"name": "b", "id": "2"},
+        {"name": "c", "id": "3"},
+    ]
+    assert csv_converter.to_json(data, {**config, "array": True}) == (
+        '[{"name": "b", "id": "2"}, {"name": "c", "id": "3"}]'
+    )
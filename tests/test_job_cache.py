@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("cachetools")
+pytest.importorskip("sqlalchemy")
+
+from app.db.models import TransformationStatus  # noqa: E402
+from app.services.job_cache import JobStatusCache  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def snapshot(status):
+    return SimpleNamespace(status=status)
+
+
+def make_cache(clock, maxsize=10):
+    return JobStatusCache(maxsize=maxsize, ttl=2, terminal_ttl=3600, timer=clock)
+
+
+def test_running_jobs_expire_after_the_short_ttl():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.set("job", snapshot(TransformationStatus.PROCESSING))
+
+    clock.now = 1.9
+    assert cache.get("job") is not None
+    clock.now = 2.1
+    assert cache.get("job") is None
+
+
+def test_completed_jobs_expire_after_the_terminal_ttl():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.set("done", snapshot(TransformationStatus.COMPLETED))
+
+    clock.now = 3599
+    assert cache.get("done").status == TransformationStatus.COMPLETED
+    clock.now = 3601
+    assert cache.get("done") is None
+
+
+def test_failed_jobs_expire_after_the_short_ttl():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.set("failed", snapshot(TransformationStatus.FAILED))
+
+    # A failed job is retried, so it may not stay failed
+    clock.now = 1.9
+    assert cache.get("failed").status == TransformationStatus.FAILED
+    clock.now = 2.1
+    assert cache.get("failed") is None
+
+
+def test_invalidate_and_size_bound():
+    clock = FakeClock()
+    cache = make_cache(clock, maxsize=2)
+    for job_id in ("a", "b", "c"):
+        cache.set(job_id, snapshot(TransformationStatus.COMPLETED))
+
+    # The least recently used job is dropped first
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+    cache.invalidate("c")
+    cache.invalidate("missing")
+    assert cache.get("c") is None
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+pytest.importorskip("pydantic_settings")
+
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from app.db.jobs import claim_job, finish_job  # noqa: E402
+from app.db.models import TransformationStatus  # noqa: E402
+
+
+class FakeResult:
+    def __init__(self, row):
+        self.row = row
+
+    def one_or_none(self):
+        return self.row
+
+
+class FakeSession:
+    """Session stand-in recording the executed statements."""
+
+    def __init__(self, row=None):
+        self.row = row
+        self.statements = []
+        self.commits = 0
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.row)
+
+    def commit(self):
+        self.commits += 1
+
+
+def compile_statement(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def test_claim_only_takes_pending_failed_or_stale_jobs():
+    db = FakeSession(row=("job-1",))
+
+    assert claim_job(db, "job-1", 600) == ("job-1",)
+    assert db.commits == 1
+
+    compiled = compile_statement(db.statements[0])
+    sql = " ".join(str(compiled).split())
+    assert "transformation_jobs.status IN (__[POSTCOMPILE_status_1]) OR" in sql
+    assert "transformation_jobs.updated_at < now() - %(now_1)s" in sql
+    assert compiled.params["status_1"] == [
+        TransformationStatus.PENDING,
+        TransformationStatus.FAILED,
+    ]
+    assert compiled.params["status_2"] == TransformationStatus.PROCESSING
+    # A retried job starts without the outcome of the failed attempt
+    assert compiled.params["error_message"] is None
+    assert compiled.params["completed_at"] is None
+    assert compiled.params["now_1"].total_seconds() == 600
+
+
+def test_claim_returns_columns_instead_of_an_entity():
+    db = FakeSession()
+
+    assert claim_job(db, "job-1", 600) is None
+
+    sql = " ".join(str(compile_statement(db.statements[0])).split())
+    assert sql.endswith(
+        "RETURNING transformation_jobs.job_id, transformation_jobs.updated_at, "
+        "transformation_jobs.job_config, transformation_jobs.job_metadata"
+    )
+
+
+def test_finish_requires_the_current_claim():
+    claimed_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db = FakeSession(row=("job-1",))
+
+    finish_job(db, "job-1", claimed_at, TransformationStatus.COMPLETED)
+
+    compiled = compile_statement(db.statements[0])
+    sql = " ".join(str(compiled).split())
+    assert "completed_at=now()" in sql
+    assert "transformation_jobs.updated_at = %(updated_at_1)s" in sql
+    assert compiled.params["updated_at_1"] == claimed_at
+    assert compiled.params["status"] == TransformationStatus.COMPLETED
+    assert compiled.params["status_1"] == TransformationStatus.PROCESSING
@@ -0,0 +1,38 @@
+from unittest import mock
+
+
+def test_add_columns_only_adds_missing_nullable_columns(main_module):
+    from sqlalchemy.dialects import postgresql
+
+    table = main_module.TransformationJob.__table__
+    added = {"target_formats", "result_file_paths", "job_id"}
+    inspector = mock.Mock()
+    inspector.get_columns.return_value = [
+        {"name": column.name} for column in table.columns if column.name not in added
+    ]
+    engine = mock.MagicMock()
+    engine.dialect = postgresql.dialect()
+
+    with mock.patch.object(main_module, "engine", engine), mock.patch.object(
+        main_module, "inspect", return_value=inspector
+    ):
+        main_module.add_columns()
+
+    conn = engine.begin.return_value.__enter__.return_value
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    # job_id is NOT NULL, it cannot be added to a table with rows
+    assert statements == [
+        "ALTER TABLE transformation_jobs ADD COLUMN IF NOT EXISTS target_formats JSON",
+        "ALTER TABLE transformation_jobs "
+        "ADD COLUMN IF NOT EXISTS result_file_paths JSON",
+    ]
+
+
+def test_add_columns_is_postgres_only(main_module):
+    engine = mock.MagicMock()
+    engine.dialect.name = "sqlite"
+
+    with mock.patch.object(main_module, "engine", engine):
+        main_module.add_columns()
+
+    engine.begin.assert_not_called()
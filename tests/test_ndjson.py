@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from app.utils import ndjson_converter
+
+
+DATA = '{"id": 1, "name": "Alice"}\n\n{"id": 2, "name": "Bob"}\n'
+
+
+def test_read_records_skips_blank_lines():
+    assert list(ndjson_converter.read_records(DATA)) == [
+        {"id": 1, "name": "Alice"},
+        {"id": 2, "name": "Bob"},
+    ]
+
+
+def test_read_records_applies_select_and_where():
+    config = {"select": ["name"], "where": [{"field": "id", "op": "gt", "value": 1}]}
+
+    assert list(ndjson_converter.read_records(DATA, config)) == [{"name": "Bob"}]
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ('{"id": 2', "Invalid JSON on line 3: Expecting"),
+        ("[1, 2]", "Invalid JSON on line 3: expected an object"),
+        ("42", "Invalid JSON on line 3: expected an object"),
+    ],
+)
+def test_read_records_reports_the_bad_line(line, message):
+    data = '{"id": 1}\n\n' + line + "\n"
+
+    with pytest.raises(ValueError, match=message):
+        list(ndjson_converter.read_records(data))
+
+
+def test_conversions_round_trip():
+    as_json = ndjson_converter.to_json(DATA, {"array": True})
+    as_csv = ndjson_converter.to_csv(DATA)
+
+    assert json.loads(as_json) == [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]
+    assert as_csv.splitlines() == ["id,name", "1,Alice", "2,Bob"]
+    assert ndjson_converter.from_json(as_json) == DATA.replace("\n\n", "\n")
+    assert ndjson_converter.from_csv(as_csv) == (
+        '{"id": "1", "name": "Alice"}\n{"id": "2", "name": "Bob"}\n'
+    )
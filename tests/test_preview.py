@@ -0,0 +1,92 @@
+import json
+
+from app.services import preview
+from app.services.preview import PreviewService
+from app.utils.json_converter import read_prefix
+
+
+class FakeStorage:
+    """Storage stand-in serving ranged reads of in-memory files."""
+
+    def __init__(self, files):
+        self.files = files
+        self.ranges = []
+
+    def download_range(self, file_path, start, end):
+        self.ranges.append((start, end))
+        return self.files[file_path][start : end + 1]
+
+
+def test_read_prefix_of_a_truncated_array():
+    text = '[{"id": 1}, {"id": 2}, {"id": 3'
+
+    assert list(read_prefix(text)) == [{"id": 1}, {"id": 2}]
+
+
+def test_read_prefix_needs_a_separator_after_an_item():
+    # The last number may continue past the end of the text
+    assert list(read_prefix("[1, 2, 34")) == [1, 2]
+    assert list(read_prefix("[1, 2, 34]")) == [1, 2, 34]
+
+
+def test_read_prefix_of_a_single_object():
+    assert list(read_prefix(' {"id": 1}')) == [{"id": 1}]
+    assert list(read_prefix('{"id": 1')) == []
+
+
+def test_csv_preview_reads_only_the_beginning(monkeypatch):
+    monkeypatch.setattr(preview, "PREVIEW_CHUNK_SIZE", 64)
+    lines = ["id;name"] + [f"{i};name {i}" for i in range(1000)]
+    storage = FakeStorage({"big.csv": "\n".join(lines).encode()})
+
+    rows = PreviewService(storage).preview("big.csv", "csv", 3)
+
+    assert rows == [
+        {"id": "0", "name": "name 0"},
+        {"id": "1", "name": "name 1"},
+        {"id": "2", "name": "name 2"},
+    ]
+    assert storage.ranges == [(0, 63)]
+
+
+def test_json_preview_grows_the_read_until_enough_items(monkeypatch):
+    monkeypatch.setattr(preview, "PREVIEW_CHUNK_SIZE", 16)
+    items = [{"id": i, "name": "x" * 10} for i in range(100)]
+    storage = FakeStorage({"big.json": json.dumps(items).encode()})
+
+    rows = PreviewService(storage).preview("big.json", "json", 5)
+
+    assert rows == items[:5]
+    assert len(storage.ranges) > 1
+    assert storage.ranges[-1][1] < len(storage.files["big.json"])
+
+
+def test_preview_of_scalars_and_short_files():
+    storage = FakeStorage(
+        {
+            "scalars.json": b"[1, 2, 3]",
+            "rows.ndjson": b'{"a": 1}\n{"a": 2}\n',
+        }
+    )
+    service = PreviewService(storage)
+
+    assert service.preview("scalars.json", "json", 10) == [1, 2, 3]
+    assert service.preview("rows.ndjson", "ndjson", 10) == [{"a": 1}, {"a": 2}]
+
+
+def test_preview_decodes_utf16_sources():
+    text = "id,name\n1,Zoë\n"
+    storage = FakeStorage({"utf16.csv": text.encode("utf-16")})
+
+    rows = PreviewService(storage).preview("utf16.csv", "csv", 10)
+
+    assert rows == [{"id": "1", "name": "Zoë"}]
+
+
+def test_preview_keeps_a_configured_quotechar():
+    # The sniffer finds double quotes, the configured quotechar wins
+    storage = FakeStorage({"quoted.csv": b'id;name\n"1";"x"\n'})
+
+    rows = PreviewService(storage).preview("quoted.csv", "csv", 10, {"quotechar": "'"})
+
+    assert rows == [{"id": '"1"', "name": '"x"'}]
@@ -0,0 +1,72 @@
+import marshal
+import pstats
+import threading
+
+from app.utils.profiling import JobProfiler
+
+
+def build_rows(count):
+    return [{"id": i, "name": f"row {i}"} for i in range(count)]
+
+
+def test_profile_captures_allocations_at_the_high_water_point():
+    with JobProfiler() as profiler:
+        rows = build_rows(20_000)
+        profiler.capture_allocations()
+        del rows
+
+    assert profiler.captured
+    assert profiler.peak_memory > 1_000_000
+
+    summary = profiler.summary()
+    assert "build_rows" in summary
+    # The rows were freed before the end, they show up only because the
+    # allocations were captured while they were alive
+    assert "test_profiling.py" in summary.split("Top 30 allocation sites:")[1]
+
+
+def test_profile_data_is_readable_by_pstats(tmp_path):
+    with JobProfiler() as profiler:
+        build_rows(10)
+
+    path = tmp_path / "job.prof"
+    path.write_bytes(profiler.profile_data())
+
+    assert marshal.loads(path.read_bytes())
+    stats = pstats.Stats(str(path))
+    assert any(name == "build_rows" for _, _, name in stats.stats)
+
+
+def test_disabled_profiler_does_nothing():
+    with JobProfiler(enabled=False) as profiler:
+        profiler.capture_allocations()
+
+    assert not profiler.captured
+    assert profiler.peak_memory is None
+
+
+def test_only_one_job_is_profiled_at_a_time():
+    entered = threading.Event()
+    release = threading.Event()
+
+    def profile_other_job():
+        with JobProfiler():
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=profile_other_job)
+    thread.start()
+    entered.wait()
+    try:
+        with JobProfiler() as profiler:
+            pass
+    finally:
+        release.set()
+        thread.join()
+
+    assert not profiler.captured
+
+    # The lock is released once the other job is done
+    with JobProfiler() as profiler:
+        pass
+    assert profiler.captured
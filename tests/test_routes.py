@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def routes(main_module):
+    from app.routes import transform
+
+    return transform
+
+
+def test_parse_config_drops_the_profile_flag(routes):
+    config = routes._parse_config(json.dumps({"delimiter": ";", "profile": True}))
+
+    assert config == {"delimiter": ";"}
+
+
+@pytest.mark.parametrize(
+    "config, detail",
+    [
+        ("{", "Invalid config: Expecting"),
+        ("[]", "Invalid config: expected an object"),
+        ('{"select": "id"}', "select must be a list of names"),
+        ('{"where": [{"field": "n", "op": "like"}]}', "Unsupported where operator"),
+        ('{"where": [{"field": "n", "op": "in", "value": 1}]}', "expects a list"),
+    ],
+)
+def test_parse_config_rejects_bad_configs(routes, config, detail):
+    from fastapi import HTTPException
+
+    with pytest.raises(HTTPException) as error:
+        routes._parse_config(config)
+
+    assert error.value.status_code == 400
+    assert detail in error.value.detail
+
+
+class FakeSession:
+    def __init__(self):
+        self.added = []
+
+    def add(self, job):
+        self.added.append(job)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def submit(main_module, routes, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from app.db.database import get_db
+
+    session = FakeSession()
+    main_module.app.dependency_overrides[get_db] = lambda: session
+    monkeypatch.setattr(
+        routes.storage_service, "upload_file", lambda **kwargs: "uploads/source.csv"
+    )
+    monkeypatch.setattr(
+        routes.tasks_service, "create_transform_task", lambda **kwargs: None
+    )
+    monkeypatch.setattr(routes.settings, "SECRET_KEY", "secret")
+    client = TestClient(main_module.app)
+
+    def submit(config, headers=None):
+        response = client.post(
+            "/api/v1/transform",
+            data={"source_format": "csv", "target_format": "json", "config": config},
+            files={"file": ("source.csv", b"id\n1\n")},
+            headers=headers or {},
+        )
+        job = session.added[-1] if response.status_code == 200 else None
+        return response, job
+
+    yield submit
+    main_module.app.dependency_overrides.clear()
+
+
+def test_users_cannot_turn_on_profiling(submit):
+    response, job = submit('{"profile": true, "delimiter": ","}')
+
+    assert response.status_code == 200
+    assert job.job_config == {"delimiter": ","}
+
+
+def test_admins_turn_on_profiling_with_the_secret_key(submit):
+    response, job = submit("{}", headers={"X-Profile-Key": "secret"})
+    assert response.status_code == 200
+    assert job.job_config == {"profile": True}
+
+    response, _ = submit("{}", headers={"X-Profile-Key": "guess"})
+    assert response.status_code == 403
@@ -0,0 +1,67 @@
+import io
+import json
+
+import pytest
+
+from app.services.transform import TransformationService
+
+
+SOURCE = json.dumps(
+    [
+        {"id": 1, "name": "Alice", "amount": 150},
+        {"id": 2, "name": "Bob", "amount": 50},
+    ]
+)
+
+
+def test_single_target_matches_transform():
+    service = TransformationService()
+
+    results = service.transform_many("json", ["csv"], SOURCE)
+
+    assert results == {"csv": service.transform("json", "csv", SOURCE)}
+
+
+def test_every_target_gets_the_same_records():
+    config = {"select": ["id", "name"], "where": {"name": "Alice"}, "array": True}
+
+    results = TransformationService().transform_many(
+        "json", ["csv", "ndjson", "json"], SOURCE, config
+    )
+
+    assert list(results) == ["csv", "ndjson", "json"]
+    assert results["csv"].splitlines() == ["id,name", "1,Alice"]
+    assert results["ndjson"] == '{"id": 1, "name": "Alice"}\n'
+    assert json.loads(results["json"]) == [{"id": 1, "name": "Alice"}]
+
+
+def test_unsupported_target_is_rejected_before_reading():
+    with pytest.raises(ValueError, match="Unsupported transformation: json to excel"):
+        TransformationService().transform_many("json", ["csv", "excel"], "not json")
+
+
+def test_outputs_written_to_streams_match_the_returned_ones():
+    config = {"array": False}
+    targets = ["csv", "ndjson", "json"]
+    expected = TransformationService().transform_many("json", targets, SOURCE, config)
+    outputs = {target: io.StringIO() for target in targets}
+
+    results = TransformationService().transform_many(
+        "json", targets, SOURCE, config, outputs
+    )
+
+    assert results == {target: None for target in targets}
+    assert {target: output.getvalue() for target, output in outputs.items()} == expected
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_streamed_json_matches_a_single_dump(count):
+    from app.utils import json_converter
+
+    records = [{"id": i} for i in range(count)]
+    output = io.StringIO()
+
+    json_converter.write_records(iter(records), {}, output)
+
+    expected = json.dumps(records[0] if count == 1 else records)
+    assert output.getvalue() == expected
@@ -0,0 +1,174 @@
+import io
+import json
+from multiprocessing import shared_memory
+
+import pytest
+
+pytest.importorskip("google.cloud.storage")
+pytest.importorskip("pydantic_settings")
+
+from app.services import worker_pool  # noqa: E402
+from app.services.worker_pool import (  # noqa: E402
+    ConversionPool,
+    SharedSource,
+    convert,
+    convert_shared,
+)
+
+
+SOURCE = json.dumps([{"id": 1, "name": "Zoë"}, {"id": 2, "name": "Bob"}])
+
+
+class FakeUpload(io.StringIO):
+    """Upload stand-in keeping the text once the upload is finished."""
+
+    def __init__(self, storage, file_path):
+        super().__init__()
+        self.storage = storage
+        self.file_path = file_path
+        self.aborted = False
+
+    def close(self):
+        if not self.closed and not self.aborted:
+            self.storage.files[self.file_path] = self.getvalue()
+        super().close()
+
+
+class FakeStorage:
+    def __init__(self):
+        self.files = {}
+        self.opened = 0
+        self.aborted = []
+        self.deleted = []
+
+    def open_upload(self, file_format, prefix="uploads"):
+        file_path = f"{prefix}/{self.opened}.{file_format}"
+        self.opened += 1
+        return file_path, FakeUpload(self, file_path)
+
+    def abort_upload(self, stream):
+        if not stream.closed:
+            stream.aborted = True
+            self.aborted.append(stream.file_path)
+
+    def delete_files(self, file_paths):
+        self.deleted.extend(file_paths)
+
+
+def test_convert_uploads_each_output():
+    storage = FakeStorage()
+
+    result_paths, cpu_time, peak_memory = convert(
+        "json", ["csv", "ndjson"], SOURCE.encode("utf-16"), storage_service=storage
+    )
+
+    csv_text = storage.files[result_paths["csv"]]
+    assert csv_text.splitlines() == ["id,name", "1,Zoë", "2,Bob"]
+    assert storage.files[result_paths["ndjson"]].count("\n") == 2
+    assert cpu_time >= 0
+    assert peak_memory > 0
+
+
+def test_convert_discards_outputs_on_failure():
+    storage = FakeStorage()
+
+    with pytest.raises(ValueError):
+        convert("json", ["csv", "ndjson"], b"[{", storage_service=storage)
+
+    assert storage.files == {}
+    assert storage.aborted == ["results/0.csv", "results/1.ndjson"]
+
+
+def shared_source(content):
+    source = SharedSource()
+    source.allocate(len(content))[:] = content
+    return source
+
+
+def test_shared_source_is_freed_on_close():
+    with shared_source(b"id\n1\n") as source:
+        name = source.name
+        assert bytes(source.buffer) == b"id\n1\n"
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_empty_shared_source():
+    with shared_source(b"") as source:
+        assert source.size == 0
+
+
+def test_convert_shared_reads_the_block_in_place(monkeypatch):
+    storage = FakeStorage()
+    monkeypatch.setattr(worker_pool, "_storage_service", storage)
+
+    with shared_source(SOURCE.encode()) as source:
+        result_paths, _, _ = convert_shared(
+            "json", ["csv"], source.name, source.size
+        )
+
+    assert storage.files[result_paths["csv"]].splitlines()[1] == "1,Zoë"
+
+
+def test_pool_without_workers_converts_inline(monkeypatch):
+    storage = FakeStorage()
+    monkeypatch.setattr(worker_pool, "_storage_service", storage)
+    pool = ConversionPool(max_workers=0, max_jobs_per_worker=1, max_memory=0)
+    pool.start()
+
+    with shared_source(SOURCE.encode()) as source:
+        result_paths, _ = pool.convert("json", ["csv"], source)
+
+    assert storage.files[result_paths["csv"]].splitlines()[0] == "id,name"
+    pool.shutdown()
+
+
+def fake_convert_shared(source_format, target_formats, name, size, config=None):
+    """Conversion run in the workers, which have no storage to upload to"""
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        content = bytes(memory.buf[:size]).decode()
+    finally:
+        memory.close()
+    return {target: f"results/{content}" for target in target_formats}, 0.0, 1
+
+
+def test_pool_replaces_workers_over_the_memory_limit(monkeypatch):
+    monkeypatch.setattr(worker_pool, "convert_shared", fake_convert_shared)
+    pool = ConversionPool(max_workers=1, max_jobs_per_worker=10, max_memory=0)
+    pool.start()
+    try:
+        executor = pool._executor
+
+        with shared_source(b"id\n1\n") as source:
+            result_paths, _ = pool.convert("csv", ["json"], source)
+
+        # The worker read the file from shared memory. Every worker is over
+        # a limit of 0 bytes, so the executor was swapped without waiting
+        # for the new workers to start
+        assert result_paths == {"json": "results/id\n1\n"}
+        assert pool._executor is not executor
+
+        with shared_source(b"a\n2\n") as source:
+            result_paths, _ = pool.convert("csv", ["ndjson"], source)
+        assert result_paths == {"ndjson": "results/a\n2\n"}
+    finally:
+        pool.shutdown()
+
+
+def test_failed_download_frees_the_shared_source():
+    names = []
+
+    def download(source):
+        view = source.allocate(4)
+        names.append(source.name)
+        view[:2] = b"id"
+        raise IOError("Incomplete slice")
+
+    with pytest.raises(IOError):
+        with SharedSource() as source:
+            download(source)
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=names[0])